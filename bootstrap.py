@@ -1,9 +1,22 @@
 import argparse
 import asyncio
 import logging
+import multiprocessing
+import os
+import signal
 
 from houdini.constants import ClientType, ConflictResolution, Language
 from houdini.houdini import Houdini
+from houdini.log import parse_sample_rates
+
+
+def run_worker(config, worker_id):
+    config.worker_id = worker_id
+    try:
+        asyncio.run(Houdini(config).start())
+    except KeyboardInterrupt:
+        pass
+
 
 if __name__ == '__main__':
     logger = logging.getLogger('houdini')
@@ -21,12 +34,16 @@ if __name__ == '__main__':
                         help='Houdini server capacity', type=int)
     parser.add_argument('-C', '--cache-expiry', dest='cache_expiry', action='store', default=3600,
                         help='Cache expiry (seconds)', type=int)
+    parser.add_argument('--cache-size', dest='cache_size', action='store', default=64,
+                        help='Cache size limit per world (MiB)', type=int)
     parser.add_argument('-P', '--plugins', action='store', default='*',
                         nargs='*', help='Plugins to load')
     parser.add_argument('-l', '--lang', action='store', default='en', help='Houdini language',
                         choices=['en', 'fr', 'pt', 'es', 'de', 'ru'])
     parser.add_argument('-tz', '--timezone', action='store', default='America/Vancouver',
                         help='Server timezone')
+    parser.add_argument('-w', '--workers', action='store', default=1, type=int,
+                        help='Number of world processes sharing the server port')
 
     login_group = parser.add_argument_group('login')
     login_group.add_argument('--login-failure-limit', action='store', default=5, help='Limit before flood limit',
@@ -36,6 +53,12 @@ if __name__ == '__main__':
     login_group.add_argument('--preactivation-days', action='store', default=7, help='Preactivation trial days',
                              type=int)
     login_group.add_argument('-S', '--staff', action='store_true', help='Staff-only server mode')
+    login_group.add_argument('--password-pool', action='store', choices=['thread', 'process'], default='thread',
+                             help='Pool used to verify password hashes')
+    login_group.add_argument('--password-workers', action='store', default=None, type=int,
+                             help='Password verification workers, defaults to the executor default')
+    login_group.add_argument('--password-queue-size', action='store', default=64, type=int,
+                             help='Password verifications allowed in flight before logins are refused')
 
     logging_group = parser.add_argument_group('logging')
     logging_group.add_argument('-lg', '--logging-general', action='store',
@@ -48,6 +71,14 @@ if __name__ == '__main__':
                                default='INFO',
                                dest='logging_level',
                                help='Logging level')
+    logging_group.add_argument('--logging-format', action='store',
+                               choices=['text', 'json'], default='text',
+                               dest='logging_format',
+                               help='Write log lines as text or as JSON objects')
+    logging_group.add_argument('--logging-sample', action='store',
+                               nargs='*', default=[],
+                               dest='logging_sample',
+                               help='Fraction of info and debug lines kept per module, as module=rate pairs')
 
     database_group = parser.add_argument_group('database')
     database_group.add_argument('-da', '--database-address', action='store',
@@ -66,6 +97,14 @@ if __name__ == '__main__':
                                 dest='database_name',
                                 default='postgres',
                                 help='Postgresql database name')
+    database_group.add_argument('--database-pool-size', action='store',
+                                dest='database_pool_size',
+                                type=int, default=10,
+                                help='Postgresql connections kept open by each process')
+    database_group.add_argument('--write-behind-interval', action='store',
+                                dest='write_behind_interval',
+                                type=float, default=0,
+                                help='Seconds between batched penguin column writes, 0 writes them immediately')
 
     redis_group = parser.add_argument_group('redis')
     redis_group.add_argument('-ra', '--redis-address', action='store',
@@ -77,6 +116,9 @@ if __name__ == '__main__':
                              type=int,
                              default=6379,
                              help='Redis server port')
+    redis_group.add_argument('--cache-redis', action='store_true',
+                             dest='cache_redis',
+                             help='Share cached strings between worlds through Redis')
 
     command_group = parser.add_argument_group('commands')
     command_group.add_argument('-cp', '--command-prefix', action='store', dest='command_prefix',
@@ -123,6 +165,42 @@ if __name__ == '__main__':
     client_group.add_argument('-kt', '--auth-ttl', action='store', type=int, default=3000,
                               help='Auth key TTL (seconds)')
 
+    connection_group = parser.add_argument_group('connection')
+    connection_group.add_argument('--framing', action='store', dest='framing',
+                                  choices=['buffered', 'stream'], default='buffered',
+                                  help='Read many packets per socket read or one packet at a time')
+    connection_group.add_argument('--write-buffer-high', action='store', dest='write_buffer_high',
+                                  type=int, default=262144,
+                                  help='Outgoing buffer size (bytes) at which a client is considered overflowing')
+    connection_group.add_argument('--write-buffer-low', action='store', dest='write_buffer_low',
+                                  type=int, default=65536,
+                                  help='Outgoing buffer size (bytes) at which an overflowing client recovers')
+    connection_group.add_argument('--write-buffer-overflow', action='store', dest='write_buffer_overflow',
+                                  choices=['disconnect', 'shed'], default='disconnect',
+                                  help='Disconnect overflowing clients or shed their outgoing packets')
+
+    metrics_group = parser.add_argument_group('metrics')
+    metrics_group.add_argument('--metrics-port', action='store', dest='metrics_port',
+                               type=int, default=None,
+                               help='Serve Prometheus metrics on this port, each world worker adds its worker ID')
+    metrics_group.add_argument('--metrics-address', action='store', dest='metrics_address',
+                               default='127.0.0.1',
+                               help='Address the metrics port listens on')
+    metrics_group.add_argument('--watchdog-threshold', action='store', dest='watchdog_threshold',
+                               type=float, default=0.5,
+                               help='Seconds a packet handler may run before it is reported, 0 disables reports')
+
+    profiler_group = parser.add_argument_group('profiler')
+    profiler_group.add_argument('--profile-format', action='store', dest='profile_format',
+                                choices=['collapsed', 'pstats'], default='collapsed',
+                                help='Write profiles as collapsed stacks for flame graphs or as pstats files')
+    profiler_group.add_argument('--profile-interval', action='store', dest='profile_interval',
+                                type=float, default=0.005,
+                                help='Seconds between profiler samples')
+    profiler_group.add_argument('--profile-directory', action='store', dest='profile_directory',
+                                default='profiles',
+                                help='Directory profiles are written to')
+
     membership_group = parser.add_argument_group('membership')
     membership_group.add_argument('--expire-membership', action='store_true', help='Should membership expire?')
 
@@ -134,10 +212,34 @@ if __name__ == '__main__':
                      es=Language.Es, de=Language.De, ru=Language.Ru).get(args.lang)
     args.command_conflict_mode = dict(silent=ConflictResolution.Silent, append=ConflictResolution.Append,
                                       exception=ConflictResolution.Exception).get(args.command_conflict_mode)
+    args.logging_sample = parse_sample_rates(args.logging_sample)
     args.default_client = dict(legacy=ClientType.Legacy, vanilla=ClientType.Vanilla).get(args.default_client)
 
-    factory_instance = Houdini(args)
-    try:
-        asyncio.run(factory_instance.start())
-    except KeyboardInterrupt:
-        logger.info('Shutting down...')
+    args.worker_id = None
+
+    if args.type == 'world' and args.workers > 1:
+        asyncio.run(Houdini(args).reset_world())
+
+        workers = [multiprocessing.Process(target=run_worker, args=(args, worker_id), daemon=True)
+                   for worker_id in range(args.workers)]
+        for worker in workers:
+            worker.start()
+
+        def forward_signal(signal_number, _):
+            for worker in workers:
+                os.kill(worker.pid, signal_number)
+
+        for forwarded_signal in ('SIGHUP', 'SIGUSR2'):
+            if hasattr(signal, forwarded_signal):
+                signal.signal(getattr(signal, forwarded_signal), forward_signal)
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            logger.info('Shutting down...')
+    else:
+        factory_instance = Houdini(args)
+        try:
+            asyncio.run(factory_instance.start())
+        except KeyboardInterrupt:
+            logger.info('Shutting down...')
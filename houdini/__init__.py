@@ -1,6 +1,7 @@
 import asyncio
 import importlib
 import logging
+import operator
 import pkgutil
 from abc import ABC, abstractmethod
 from collections import OrderedDict
@@ -20,6 +21,16 @@ def get_package_modules(package):
     return package_modules
 
 
+def compile_xt(handler_id, *data):
+    xt_data = '%'.join(str(d) for d in data)
+    return f'%xt%{handler_id}%-1%{xt_data}%'
+
+
+def encode_xt(handler_id, *data):
+    """Serializes an XT packet to bytes once, so it can be written to any number of clients"""
+    return compile_xt(handler_id, *data).encode('utf-8') + b'\x00'
+
+
 class _AbstractManager(dict):
     def __init__(self, server):
         self.server = server
@@ -79,9 +90,10 @@ class IWaddle(ABC):
         p.waddle = None
 
     async def send_xt(self, *data, f=None):
+        line = encode_xt(*data)
         for penguin in filter(f, self.penguins):
             if penguin is not None:
-                await penguin.send_xt(*data)
+                penguin.send_encoded(line)
 
     def get_seat_id(self, p):
         return self.penguins.index(p)
@@ -90,13 +102,74 @@ class IWaddle(ABC):
 class PenguinStringCompiler(OrderedDict):
 
     def __init__(self, *args, **kwargs):
+        self._accessor = None
+        self._accessor_built = False
+
         super().__init__(*args, **kwargs)
 
     def __setitem__(self, key, compiler_method):
         assert type(compiler_method) == FunctionType
         super().__setitem__(key, compiler_method)
+        self._invalidate()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._invalidate()
+
+    def pop(self, *args):
+        self._invalidate()
+        return super().pop(*args)
+
+    def popitem(self, last=True):
+        self._invalidate()
+        return super().popitem(last)
+
+    def clear(self):
+        self._invalidate()
+        super().clear()
+
+    def move_to_end(self, key, last=True):
+        self._invalidate()
+        super().move_to_end(key, last)
+
+    def _invalidate(self):
+        self._accessor = None
+        self._accessor_built = False
+
+    def _build_accessor(self):
+        compiler_methods = tuple(self.values())
+        if any(asyncio.iscoroutinefunction(compiler_method) for compiler_method in compiler_methods):
+            return None
+
+        attribute_names = tuple(getattr(compiler_method, 'attribute_name', None)
+                                for compiler_method in compiler_methods)
+        if len(attribute_names) > 1 and None not in attribute_names:
+            attribute_getter = operator.attrgetter(*attribute_names)
+
+            def compile_attributes(p):
+                return '|'.join([str(attribute or 0) for attribute in attribute_getter(p)])
+            return compile_attributes
+
+        def compile_methods(p):
+            return '|'.join([str(compiler_method(p)) for compiler_method in compiler_methods])
+        return compile_methods
+
+    @property
+    def accessor(self):
+        """
+        Synchronous function compiling a penguin string in a single pass,
+        or None if a compiler method is a coroutine and the async path must be used.
+        """
+        if not self._accessor_built:
+            self._accessor = self._build_accessor()
+            self._accessor_built = True
+        return self._accessor
 
     async def compile(self, p):
+        accessor = self.accessor
+        if accessor is not None:
+            return accessor(p)
+
         compiler_method_results = []
 
         for compiler_method in self.values():
@@ -111,13 +184,14 @@ class PenguinStringCompiler(OrderedDict):
 
     @classmethod
     def attribute_by_name(cls, attribute_name):
-        async def attribute_method(p):
+        def attribute_method(p):
             return getattr(p, attribute_name) or 0
+        attribute_method.attribute_name = attribute_name
         return attribute_method
 
     @classmethod
     def custom_attribute_by_name(cls, attribute_name):
-        async def attribute_method(p):
+        def attribute_method(p):
             return p.get_custom_attribute(attribute_name, '')
         return attribute_method
 
@@ -0,0 +1,352 @@
+import asyncio
+import random
+import re
+import statistics
+import time
+from collections import defaultdict
+
+from houdini.crypto import Crypto
+
+Delimiter = b'\x00'
+
+_RandomKey = re.compile(r'<k>(?:<!\[CDATA\[)?(.*?)(?:]]>)?</k>')
+
+# Client-side pacing of every packet the bench replays. The intervals mirror the server cooldowns,
+# a packet that is still cooling down for a client is swapped for u#sp so every request is answered.
+PacketCooldowns = {
+    'sp': 0,
+    'sm': .5,
+    'jr': .5,
+    'h': 59,
+    'sf': .5,
+    'se': 1,
+    'sb': 1
+}
+
+BenchMessages = ['hi', 'hello', 'how are you', 'lol', 'cool igloo', 'follow me', 'nice', 'brb']
+
+
+def percentile(samples, percent):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[percent - 1]
+
+
+def read_rss(pid):
+    """Returns the resident set size of a process in bytes, or None if it can't be read from /proc"""
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class BenchError(Exception):
+    """Raised when the server refuses or drops a simulated client"""
+
+
+class BenchStats:
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.timeouts = defaultdict(int)
+        self.errors = defaultdict(int)
+
+        self.handshakes = []
+        self.failed_handshakes = 0
+
+        self.sent_packets = 0
+        self.received_packets = 0
+
+        self.rss = defaultdict(list)
+
+        self.started = time.monotonic()
+        self.finished = None
+
+    def sample_rss(self, pids):
+        for pid in pids:
+            rss = read_rss(pid)
+            if rss is not None:
+                self.rss[pid].append(rss)
+
+    def report(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        latencies = [latency for handler_latencies in self.latencies.values() for latency in handler_latencies]
+
+        lines = [
+            f'Duration: {elapsed:.1f}s',
+            f'Handshakes: {len(self.handshakes)} ok, {self.failed_handshakes} failed, '
+            f'p50 {percentile(self.handshakes, 50) * 1000:.1f}ms, p99 {percentile(self.handshakes, 99) * 1000:.1f}ms',
+            f'Packets: {self.sent_packets} sent ({self.sent_packets / elapsed:.1f}/s), '
+            f'{self.received_packets} received ({self.received_packets / elapsed:.1f}/s)',
+            f'Round trip: p50 {percentile(latencies, 50) * 1000:.2f}ms, p99 {percentile(latencies, 99) * 1000:.2f}ms'
+        ]
+
+        for handler_id in sorted(set(self.latencies) | set(self.timeouts) | set(self.errors)):
+            handler_latencies = self.latencies[handler_id]
+            lines.append(f'  {handler_id:>3}: {len(handler_latencies):>8} replies, '
+                         f'p50 {percentile(handler_latencies, 50) * 1000:8.2f}ms, '
+                         f'p99 {percentile(handler_latencies, 99) * 1000:8.2f}ms, '
+                         f'{self.timeouts[handler_id]} timeouts, {self.errors[handler_id]} errors')
+
+        for pid, samples in self.rss.items():
+            lines.append(f'Server {pid} RSS: start {samples[0] / 2 ** 20:.1f}MiB, '
+                         f'end {samples[-1] / 2 ** 20:.1f}MiB, peak {max(samples) / 2 ** 20:.1f}MiB')
+
+        return '\n'.join(lines)
+
+
+class BenchClient:
+    """A simulated game client which logs in through the login server and replays packets on the world server"""
+
+    def __init__(self, config, stats, username, vanilla):
+        self.config = config
+        self.stats = stats
+
+        self.username = username
+        self.vanilla = vanilla
+
+        self.id = None
+        self.login_key = None
+        self.room_id = None
+
+        self._reader = None
+        self._writer = None
+        self._listener = None
+
+        self._expected = None
+        self._reply = None
+        self._last_sent = {}
+
+    @property
+    def version(self):
+        return self.config.vanilla_version if self.vanilla else self.config.legacy_version
+
+    async def connect(self, address, port):
+        self._reader, self._writer = await asyncio.open_connection(address, port, limit=2 ** 20)
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    async def send_line(self, line):
+        self._writer.write(line.encode('utf-8') + Delimiter)
+        await self._writer.drain()
+
+    async def send_xt(self, packet_id, *data):
+        xt_data = '%'.join(str(d) for d in data)
+        await self.send_line(f'%xt%s%{packet_id}%-1%{xt_data}%')
+        self.stats.sent_packets += 1
+
+    async def receive_line(self):
+        try:
+            line = await self._reader.readuntil(Delimiter)
+        except asyncio.IncompleteReadError:
+            raise BenchError(f'{self.username} was disconnected')
+        return line[:-1].decode('utf-8')
+
+    async def receive_xt(self, handler_id):
+        while True:
+            line = await self.receive_line()
+            if line.startswith('%xt%'):
+                handler, _, *data = line.split('%')[2:-1]
+                if handler == 'e':
+                    raise BenchError(f'{self.username} received error {data[0]}')
+                if handler == handler_id:
+                    return data
+
+    async def receive_xml(self, action):
+        while True:
+            line = await self.receive_line()
+            if f'action="{action}"' in line:
+                return line
+
+    async def authenticate(self, get_credentials):
+        """Performs the verChk and rndK exchange, then logs in with the credentials derived from the random key"""
+        await self.send_line(f"<msg t='sys'><body action='verChk' r='0'><ver v='{self.version}' /></body></msg>")
+        await self.receive_xml('apiOK')
+
+        await self.send_line("<msg t='sys'><body action='rndK' r='-1'></body></msg>")
+        random_key = _RandomKey.search(await self.receive_xml('rndK')).group(1)
+
+        nickname, password = get_credentials(random_key)
+        await self.send_line(f"<msg t='sys'><body action='login' r='0'><login z='{self.config.zone}'>"
+                             f"<nick><![CDATA[{nickname}]]></nick><pword><![CDATA[{password}]]></pword>"
+                             f"</login></body></msg>")
+
+    async def login(self):
+        """Logs in through the login server, joins the world server and waits for the spawn room"""
+        await self.connect(self.config.login_address, self.config.login_port)
+        await self.authenticate(lambda _: (self.username, self.config.password))
+        login_data = await self.receive_xt('l')
+        await self.close()
+
+        if self.vanilla:
+            raw_login_data, confirmation_hash = login_data[0], login_data[1]
+            self.id, _, _, self.login_key, *_ = raw_login_data.split('|')
+        else:
+            self.id, self.login_key = login_data[0], login_data[1]
+
+        def get_world_credentials(random_key):
+            client_key = Crypto.encrypt_password(self.login_key + random_key) + self.login_key
+            if self.vanilla:
+                return raw_login_data, f'{client_key}#{confirmation_hash}'
+            return self.username, client_key
+
+        await self.connect(self.config.world_address, self.config.world_port)
+        await self.authenticate(get_world_credentials)
+        await self.receive_xt('l')
+
+        await self.send_xt('j#js', self.id, self.login_key, 'en')
+        await self.receive_xt('js')
+        self.room_id = int((await self.receive_xt('jr'))[0])
+
+        self._listener = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        try:
+            while True:
+                line = await self.receive_line()
+                self.stats.received_packets += 1
+
+                if self._expected is None or not line.startswith('%xt%'):
+                    continue
+
+                handler, _, *data = line.split('%')[2:-1]
+                expected_handler, owned = self._expected
+                if self._reply.done():
+                    continue
+                if handler == 'e':
+                    self._reply.set_exception(BenchError(data[0]))
+                elif handler == expected_handler and (not owned or data[0] == self.id):
+                    self._reply.set_result(data)
+        except BenchError as e:
+            if self._reply is not None and not self._reply.done():
+                self._reply.set_exception(e)
+
+    def choose_packet(self):
+        handler_id = random.choices(list(self.config.mix), weights=list(self.config.mix.values()))[0]
+        now = time.monotonic()
+        if now - self._last_sent.get(handler_id, -PacketCooldowns[handler_id]) < PacketCooldowns[handler_id]:
+            handler_id = 'sp'
+        self._last_sent[handler_id] = now
+        return handler_id
+
+    async def send_packet(self, handler_id):
+        """Sends one packet from the mix, returning the handler id of the reply and whether it echoes our id"""
+        if handler_id == 'sp':
+            await self.send_xt('u#sp', random.randint(100, 700), random.randint(200, 450))
+        elif handler_id == 'sm':
+            await self.send_xt('m#sm', self.id, random.choice(BenchMessages))
+        elif handler_id == 'jr':
+            self.room_id = random.choice([room_id for room_id in self.config.rooms if room_id != self.room_id]
+                                         or self.config.rooms)
+            await self.send_xt('j#jr', self.room_id, random.randint(100, 700), random.randint(200, 450))
+            return 'jr', False
+        elif handler_id == 'h':
+            await self.send_xt('u#h')
+            return 'h', False
+        elif handler_id == 'sf':
+            await self.send_xt('u#sf', random.choice([17, 18, 24, 25, 26]))
+        elif handler_id == 'se':
+            await self.send_xt('u#se', random.randint(1, 12))
+        elif handler_id == 'sb':
+            await self.send_xt('u#sb', random.randint(100, 700), random.randint(200, 450))
+        return handler_id, True
+
+    async def request(self, handler_id):
+        self._reply = asyncio.get_event_loop().create_future()
+
+        sent = time.monotonic()
+        self._expected = await self.send_packet(handler_id)
+        try:
+            await asyncio.wait_for(self._reply, self.config.timeout)
+            self.stats.latencies[handler_id].append(time.monotonic() - sent)
+        except asyncio.TimeoutError:
+            self.stats.timeouts[handler_id] += 1
+        except BenchError:
+            self.stats.errors[handler_id] += 1
+        finally:
+            self._expected = None
+
+    async def run(self, deadline):
+        interval = 1 / self.config.rate
+        while time.monotonic() < deadline and self._listener is not None and not self._listener.done():
+            started = time.monotonic()
+            await self.request(self.choose_packet())
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+async def create_accounts(config, usernames):
+    """Creates any bench accounts missing from the database"""
+    import bcrypt
+
+    from houdini.data import db
+    from houdini.data.penguin import Penguin
+
+    await db.set_bind('postgresql://{}:{}@{}/{}'.format(
+        config.database_username, config.database_password,
+        config.database_address,
+        config.database_name))
+
+    existing = {username for username, in await db.select([Penguin.username]).where(
+        Penguin.username.in_(usernames)).gino.all()}
+    password = bcrypt.hashpw(config.password.encode('utf-8'), bcrypt.gensalt(12)).decode('utf-8')
+
+    for username in usernames:
+        if username not in existing:
+            await Penguin.create(username=username, nickname=username, password=password,
+                                 email=f'{username}@localhost', active=True, approval_en=True)
+
+    await db.pop_bind().close()
+
+
+async def run_client(config, stats, username, vanilla, handshakes, deadline):
+    client = BenchClient(config, stats, username, vanilla)
+    try:
+        async with handshakes:
+            started = time.monotonic()
+            await asyncio.wait_for(client.login(), config.timeout)
+            stats.handshakes.append(time.monotonic() - started)
+    except (BenchError, OSError, asyncio.TimeoutError):
+        stats.failed_handshakes += 1
+        return await client.close()
+
+    await client.run(deadline)
+    await client.close()
+
+
+async def sample_rss(config, stats):
+    while True:
+        stats.sample_rss(config.server_pids)
+        await asyncio.sleep(1)
+
+
+async def run(config):
+    usernames = [config.username.format(index) for index in range(config.first, config.first + config.clients)]
+    if config.create_accounts:
+        await create_accounts(config, usernames)
+
+    stats = BenchStats()
+    rss_sampler = asyncio.create_task(sample_rss(config, stats))
+
+    deadline = stats.started + config.ramp + config.duration
+    handshakes = asyncio.Semaphore(config.connect_concurrency)
+
+    async def start_client(index, username):
+        await asyncio.sleep(config.ramp * index / len(usernames))
+        await run_client(config, stats, username, random.random() < config.vanilla_ratio, handshakes, deadline)
+
+    await asyncio.gather(*(start_client(index, username) for index, username in enumerate(usernames)))
+
+    stats.finished = time.monotonic()
+    stats.sample_rss(config.server_pids)
+    rss_sampler.cancel()
+    return stats
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+
+from houdini.bench import PacketCooldowns, run
+
+
+def parse_mix(mix):
+    weights = {}
+    for entry in mix:
+        handler_id, _, weight = entry.partition('=')
+        if handler_id not in PacketCooldowns:
+            raise argparse.ArgumentTypeError(f'Unknown packet {handler_id}, choose from {", ".join(PacketCooldowns)}')
+        weights[handler_id] = float(weight or 1)
+    return weights
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test a Houdini login and world server pair')
+    parser.add_argument('-n', '--clients', action='store', default=100, type=int,
+                        help='Number of simulated clients')
+    parser.add_argument('-d', '--duration', action='store', default=60, type=float,
+                        help='Seconds each client replays packets for once every client has logged in')
+    parser.add_argument('-r', '--rate', action='store', default=1, type=float,
+                        help='Packets sent per second by each client')
+    parser.add_argument('--ramp', action='store', default=10, type=float,
+                        help='Seconds over which clients are started')
+    parser.add_argument('--connect-concurrency', action='store', dest='connect_concurrency', default=50, type=int,
+                        help='Maximum number of handshakes in flight')
+    parser.add_argument('-t', '--timeout', action='store', default=5, type=float,
+                        help='Seconds to wait for a reply before counting a timeout')
+    parser.add_argument('-m', '--mix', action='store', nargs='*',
+                        default=['sp=50', 'sm=20', 'jr=5', 'h=1', 'sf=10', 'se=10', 'sb=4'],
+                        help='Packet mix as handler=weight pairs')
+    parser.add_argument('--rooms', action='store', nargs='*', type=int,
+                        default=[100, 110, 120, 130, 200, 300, 310, 800, 801],
+                        help='Rooms clients move between with j#jr')
+    parser.add_argument('--server-pid', action='append', dest='server_pids', type=int, default=[],
+                        help='Server process to sample RSS from, may be given more than once')
+
+    server_group = parser.add_argument_group('servers')
+    server_group.add_argument('--login-address', action='store', default='127.0.0.1', help='Login server address')
+    server_group.add_argument('--login-port', action='store', default=6112, type=int, help='Login server port')
+    server_group.add_argument('--world-address', action='store', default='127.0.0.1', help='World server address')
+    server_group.add_argument('--world-port', action='store', default=9875, type=int, help='World server port')
+    server_group.add_argument('-z', '--zone', action='store', default='w1', help='Login zone')
+
+    client_group = parser.add_argument_group('client')
+    client_group.add_argument('-u', '--username', action='store', default='bench{}',
+                              help='Username format, formatted with the client index')
+    client_group.add_argument('--first', action='store', default=0, type=int, help='First client index')
+    client_group.add_argument('--password', action='store', default='password',
+                              help='Password sent to the login server')
+    client_group.add_argument('--vanilla-ratio', action='store', dest='vanilla_ratio', default=.5, type=float,
+                              help='Fraction of clients using the vanilla client protocol')
+    client_group.add_argument('--legacy-version', action='store', type=int, default=153,
+                              help='Legacy client version')
+    client_group.add_argument('--vanilla-version', action='store', type=int, default=253,
+                              help='Vanilla client version')
+
+    database_group = parser.add_argument_group('database')
+    database_group.add_argument('--create-accounts', action='store_true',
+                                help='Create missing bench accounts before starting')
+    database_group.add_argument('-da', '--database-address', action='store',
+                                dest='database_address',
+                                default='localhost',
+                                help='Postgresql database address')
+    database_group.add_argument('-du', '--database-username', action='store',
+                                dest='database_username',
+                                default='postgres',
+                                help='Postgresql database username')
+    database_group.add_argument('-dp', '--database-password', action='store',
+                                dest='database_password',
+                                default='password',
+                                help='Postgresql database password')
+    database_group.add_argument('-dn', '--database-name', action='store',
+                                dest='database_name',
+                                default='postgres',
+                                help='Postgresql database name')
+
+    args = parser.parse_args()
+    try:
+        args.mix = parse_mix(args.mix)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+
+    try:
+        print(asyncio.run(run(args)).report())
+    except KeyboardInterrupt:
+        pass
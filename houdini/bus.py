@@ -0,0 +1,255 @@
+import asyncio
+import uuid
+
+import ujson
+
+from houdini import encode_xt
+
+HeartbeatInterval = 5
+WorkerTimeout = 15
+KickTimeout = 5
+StringInterval = 0.1
+
+# Removes a penguin's location and online entry only if they still belong to the given session
+ReleaseSession = '''
+local location = redis.call('HGET', KEYS[1], ARGV[1])
+if not location or string.sub(location, 1, string.len(ARGV[2]) + 1) == ARGV[2] .. '|' then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('SREM', KEYS[2], ARGV[1])
+end
+return redis.call('SCARD', KEYS[2])
+'''
+
+
+class WorldBus:
+    """
+    Routes room broadcasts and player lookups between the worker processes of one world over Redis pub/sub.
+    Each worker owns its own connections, rooms are shared by publishing their traffic to the other workers.
+    Workers refresh a heartbeat key, and the players and room occupants of a worker whose key expires are dropped.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.worker_id = server.config.worker_id
+
+        self.channel = f'houdini.bus.{server.config.id}'
+        self.locations_key = f'houdini.locations.{server.config.id}'
+        self.players_key = f'houdini.players.{server.config.id}'
+        self.workers_key = f'houdini.workers.{server.config.id}'
+
+        self.remote_occupants = {}
+
+        self._pubsub = None
+        self._listener = None
+        self._heartbeat = None
+        self._release_session = None
+        self._pending_strings = {}
+        self._string_publisher = None
+        self._pending_kicks = {}
+
+    async def start(self):
+        self._pubsub = self.server.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._listener = asyncio.create_task(self._listen())
+
+        self._release_session = self.server.redis.register_script(ReleaseSession)
+        await self.server.redis.set(f'{self.workers_key}.{self.worker_id}', 1, ex=WorkerTimeout)
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    async def close(self):
+        for task in (self._listener, self._heartbeat, self._string_publisher):
+            if task is not None:
+                task.cancel()
+        self._listener = self._heartbeat = self._string_publisher = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def publish(self, operation, **data):
+        message = ujson.dumps({'worker': self.worker_id, 'op': operation, **data})
+        await self.server.redis.publish(self.channel, message)
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message['type'] != 'message':
+                continue
+
+            data = ujson.loads(message['data'])
+            worker = data.pop('worker')
+            if worker == self.worker_id:
+                continue
+
+            try:
+                await getattr(self, f'_on_{data.pop("op")}')(worker, **data)
+            except Exception as e:
+                self.server.logger.exception(e)
+
+    def get_room(self, room_key):
+        room_type, room_id = room_key.split('.')
+        if room_type == 'room':
+            return self.server.rooms.get(int(room_id))
+        return self.server.igloos_by_penguin_id.get(int(room_id))
+
+    def get_remote_strings(self, room):
+        return [string for _, string in self.remote_occupants.get(room.bus_key, {}).values()]
+
+    async def send_room_line(self, room, line):
+        await self.publish('room_line', room=room.bus_key, line=line.decode('utf-8'))
+
+    def update_occupant(self, room, p):
+        if not p.stealth_moderator:
+            self._pending_strings[room.bus_key, p.id] = (room, p)
+            if self._string_publisher is None:
+                self._string_publisher = asyncio.create_task(self._publish_strings())
+
+    async def _publish_strings(self):
+        """Publishes the occupant strings changed during the last interval in a single message"""
+        try:
+            await asyncio.sleep(StringInterval)
+            pending_strings, self._pending_strings = self._pending_strings, {}
+            strings = [[room_key, penguin_id, await room.get_penguin_string(p)]
+                       for (room_key, penguin_id), (room, p) in pending_strings.items() if p.room is room]
+            if strings:
+                await self.publish('room_strings', strings=strings)
+        except Exception as e:
+            self.server.logger.exception(e)
+
+        self._string_publisher = None
+        if self._pending_strings:
+            self._string_publisher = asyncio.create_task(self._publish_strings())
+
+    async def join_room(self, room, p):
+        room_type = 'backyard' if room.backyard else 'igloo' if room.igloo else 'invalid'
+        room_owner = room.penguin_id if room.igloo else -1
+        location = f'{p.session_id}|{self.worker_id}|{room.id}|{room_type}|{room_owner}|' \
+                   f'{room.external_id if room.igloo else room.id}'
+        await self.server.redis.hset(self.locations_key, p.id, location)
+
+    async def leave_room(self, room, p):
+        self._pending_strings.pop((room.bus_key, p.id), None)
+        await self.publish('room_leave', room=room.bus_key, penguin_id=p.id)
+
+    async def disconnect(self, p):
+        """Removes the penguin's location and online entry unless a newer session has replaced them"""
+        return await self._release_session(keys=[self.locations_key, self.players_key], args=[p.id, p.session_id])
+
+    async def locate(self, penguin_id):
+        """Returns the room id, room type, igloo owner and external room id of an online penguin"""
+        location = await self.server.redis.hget(self.locations_key, penguin_id)
+        if location is None:
+            return None
+        _, _, room_id, room_type, room_owner, external_id = location.decode().split('|')
+        return int(room_id), room_type, int(room_owner), int(external_id)
+
+    async def get_online(self, penguin_ids):
+        penguin_ids = list(penguin_ids)
+        if not penguin_ids:
+            return set()
+        online = await self.server.redis.smismember(self.players_key, penguin_ids)
+        return {penguin_id for penguin_id, is_online in zip(penguin_ids, online) if is_online}
+
+    async def get_population(self):
+        return await self.server.redis.scard(self.players_key)
+
+    async def send_xt(self, penguin_id, *data):
+        if penguin_id in self.server.penguins_by_id:
+            await self.server.penguins_by_id[penguin_id].send_xt(*data)
+        else:
+            await self.publish('penguin_line', penguin_id=penguin_id, line=encode_xt(*data).decode('utf-8'))
+
+    async def kick(self, penguin_id):
+        """
+        Closes the penguin's session on whichever worker holds it and waits until that worker
+        has saved and removed it. Returns whether a session was closed.
+        """
+        request_id = uuid.uuid4().hex
+        online = await self.server.redis.hexists(self.locations_key, penguin_id)
+        kicked = self._pending_kicks[request_id] = asyncio.get_running_loop().create_future()
+        try:
+            await self.publish('penguin_kick', penguin_id=penguin_id, request_id=request_id)
+            if online:
+                await asyncio.wait_for(kicked, KickTimeout)
+                return True
+        except asyncio.TimeoutError:
+            self.server.logger.warning('Timed out waiting for penguin %s to be kicked from another worker',
+                                       penguin_id)
+        finally:
+            del self._pending_kicks[request_id]
+        return False
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(HeartbeatInterval)
+            try:
+                await self.server.redis.set(f'{self.workers_key}.{self.worker_id}', 1, ex=WorkerTimeout)
+                await self.drop_dead_workers()
+            except Exception as e:
+                self.server.logger.exception(e)
+
+    async def drop_dead_workers(self):
+        locations = await self.server.redis.hgetall(self.locations_key)
+        sessions = {}
+        for penguin_id, location in locations.items():
+            session_id, worker, _ = location.decode().split('|', 2)
+            sessions.setdefault(int(worker), []).append((penguin_id, session_id))
+        for occupants in self.remote_occupants.values():
+            for worker, _ in occupants.values():
+                sessions.setdefault(worker, [])
+        sessions.pop(self.worker_id, None)
+        if not sessions:
+            return
+
+        async with self.server.redis.pipeline(transaction=False) as pipe:
+            for worker in sessions:
+                pipe.exists(f'{self.workers_key}.{worker}')
+            alive = await pipe.execute()
+
+        dead_workers = {worker for worker, is_alive in zip(sessions, alive) if not is_alive}
+        if not dead_workers:
+            return
+
+        for room_key, occupants in list(self.remote_occupants.items()):
+            for penguin_id, (worker, _) in list(occupants.items()):
+                if worker in dead_workers:
+                    del occupants[penguin_id]
+            if not occupants:
+                del self.remote_occupants[room_key]
+
+        population = None
+        for worker in dead_workers:
+            self.server.logger.warning('Worker %s stopped reporting, dropping its %d players',
+                                       worker, len(sessions[worker]))
+            for penguin_id, session_id in sessions[worker]:
+                population = await self._release_session(keys=[self.locations_key, self.players_key],
+                                                          args=[penguin_id, session_id])
+        if population is not None:
+            await self.server.redis.hset('houdini.population', self.server.config.id, population)
+
+    async def _on_room_line(self, worker, room, line):
+        room = self.get_room(room)
+        if room is not None:
+            room.send_encoded(line.encode('utf-8'))
+
+    async def _on_room_strings(self, worker, strings):
+        for room, penguin_id, string in strings:
+            self.remote_occupants.setdefault(room, {})[penguin_id] = (worker, string)
+
+    async def _on_room_leave(self, worker, room, penguin_id):
+        occupants = self.remote_occupants.get(room, {})
+        occupants.pop(penguin_id, None)
+        if not occupants:
+            self.remote_occupants.pop(room, None)
+
+    async def _on_penguin_line(self, worker, penguin_id, line):
+        if penguin_id in self.server.penguins_by_id:
+            self.server.penguins_by_id[penguin_id].send_encoded(line.encode('utf-8'))
+
+    async def _on_penguin_kick(self, worker, penguin_id, request_id):
+        if penguin_id in self.server.penguins_by_id:
+            await self.server.penguins_by_id[penguin_id].close()
+            await self.publish('penguin_kicked', request_id=request_id)
+
+    async def _on_penguin_kicked(self, worker, request_id):
+        kicked = self._pending_kicks.get(request_id)
+        if kicked is not None and not kicked.done():
+            kicked.set_result(None)
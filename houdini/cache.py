@@ -0,0 +1,176 @@
+import asyncio
+import sys
+import time
+import types
+import uuid
+from collections import OrderedDict
+
+import ujson
+
+InvalidationChannel = 'houdini.cache.invalidate'
+
+
+def get_size(value, seen=None):
+    """Approximate deep size of a value in bytes, following containers and instance attributes"""
+    if isinstance(value, (str, bytes, int, float)):
+        return sys.getsizeof(value)
+
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(get_size(key, seen) + get_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(get_size(item, seen) for item in value)
+    elif hasattr(value, '__dict__') and not isinstance(value, (type, types.ModuleType, types.FunctionType)):
+        size += get_size(vars(value), seen)
+    return size
+
+
+class LocalCache:
+    """Least recently used cache bounded by the approximate size of its keys and values in bytes"""
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self.size = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        value, size, expires = entry
+        if expires < time.monotonic():
+            self.delete(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.delete(key)
+
+        size = sys.getsizeof(key) + get_size(value)
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (value, size, time.monotonic() + self.ttl)
+        self.size += size
+
+        while self.size > self.max_bytes:
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+class TieredCache:
+    """
+    Per-world cache in front of an optional Redis tier shared by every world. String values are written
+    through to Redis so a player card or igloo warmed by one world is a Redis hit for the others.
+    Values loaded after a miss are filled without replacing what is already in Redis, a set after a write
+    overwrites it and, like a delete, is published so other worlds drop their local copy of the key.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.ttl = server.config.cache_expiry
+        self.shared = server.config.cache_redis
+
+        self.local = LocalCache(server.config.cache_size * 2 ** 20, self.ttl)
+        self.origin = uuid.uuid4().hex
+
+        self.hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+        self._pubsub = None
+        self._listener = None
+
+    async def start(self):
+        self._pubsub = self.server.redis.pubsub()
+        await self._pubsub.subscribe(InvalidationChannel)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.shared:
+            value = await self.server.redis.get(f'houdini.cache.{key}')
+            if value is not None:
+                self.remote_hits += 1
+                value = value.decode('utf-8')
+                self.local.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def fill(self, key, value):
+        self.local.set(key, value)
+
+        if self.shared and isinstance(value, str):
+            await self.server.redis.set(f'houdini.cache.{key}', value, ex=self.ttl, nx=True)
+
+    async def set(self, key, value):
+        self.local.set(key, value)
+
+        if self.shared and isinstance(value, str):
+            await self.server.redis.set(f'houdini.cache.{key}', value, ex=self.ttl)
+        await self.invalidate(key)
+
+    async def delete(self, key):
+        self.local.delete(key)
+
+        if self.shared:
+            await self.server.redis.delete(f'houdini.cache.{key}')
+        await self.invalidate(key)
+
+    async def invalidate(self, key):
+        if self._pubsub is not None:
+            await self.server.redis.publish(InvalidationChannel, ujson.dumps({'origin': self.origin, 'key': key}))
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'remote_hits': self.remote_hits,
+            'misses': self.misses,
+            'evictions': self.local.evictions,
+            'entries': len(self.local),
+            'bytes': self.local.size
+        }
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message['type'] != 'message':
+                continue
+
+            data = ujson.loads(message['data'])
+            if data['origin'] != self.origin:
+                self.local.delete(data['key'])
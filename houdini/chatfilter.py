@@ -0,0 +1,101 @@
+from collections import deque
+
+Wildcard = '*'
+
+
+def get_severity(rule):
+    return 3 if rule.ban else 2 if rule.warn else 1 if rule.filter else 0
+
+
+class ChatFilter:
+    """
+    Compiled chat filter rules. Single word rules are looked up per token in a dict, phrase rules and
+    rules with a leading or trailing * wildcard are found in one pass over the message by an Aho-Corasick automaton.
+    When several rules match, the one with the harshest consequence wins (ban, then warn, then filter).
+    """
+
+    __slots__ = ['words', 'patterns', 'goto', 'fail', 'output']
+
+    def __init__(self, rules):
+        self.words = {}
+        self.patterns = 0
+
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for rule in rules:
+            pattern = ' '.join(rule.word.lower().split())
+            if not pattern.strip(Wildcard):
+                continue
+            if Wildcard not in pattern and ' ' not in pattern:
+                if get_severity(rule) >= get_severity(self.words.get(pattern, rule)):
+                    self.words[pattern] = rule
+            else:
+                self.__add_pattern(pattern, rule)
+
+        self.__build_failure_links()
+
+    def __len__(self):
+        return len(self.words) + self.patterns
+
+    def __add_pattern(self, pattern, rule):
+        prefix, suffix = pattern.startswith(Wildcard), pattern.endswith(Wildcard)
+        pattern = pattern.strip(Wildcard)
+
+        state = 0
+        for character in pattern:
+            if character not in self.goto[state]:
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][character] = len(self.goto) - 1
+            state = self.goto[state][character]
+        self.output[state].append((len(pattern), not prefix, not suffix, rule))
+        self.patterns += 1
+
+    def __build_failure_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for character, next_state in self.goto[state].items():
+                queue.append(next_state)
+
+                fail = self.fail[state]
+                while fail and character not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(character, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def match(self, message):
+        """Returns the harshest rule matched by the message, or None if it's clean"""
+        tokens = message.lower().split()
+        matched, severity = None, -1
+
+        for token in tokens:
+            rule = self.words.get(token)
+            if rule is not None and get_severity(rule) > severity:
+                matched, severity = rule, get_severity(rule)
+                if severity == 3:
+                    return matched
+
+        if len(self.goto) > 1:
+            text = ' '.join(tokens)
+            state = 0
+            for end, character in enumerate(text, 1):
+                while state and character not in self.goto[state]:
+                    state = self.fail[state]
+                state = self.goto[state].get(character, 0)
+
+                for length, whole_start, whole_end, rule in self.output[state]:
+                    if get_severity(rule) <= severity:
+                        continue
+                    if whole_start and end - length > 0 and text[end - length - 1] != ' ':
+                        continue
+                    if whole_end and end < len(text) and text[end] != ' ':
+                        continue
+                    matched, severity = rule, get_severity(rule)
+                    if severity == 3:
+                        return matched
+
+        return matched
@@ -1,4 +1,5 @@
 import inspect
+import time
 
 from houdini import _AbstractManager, handlers, plugins
 from houdini.constants import ConflictResolution
@@ -23,11 +24,19 @@ class _Command(_ArgumentDeserializer):
             await super()._check_cooldown(p)
             super()._check_list(p)
 
-            await super().__call__(p, data)
+            started = time.perf_counter()
+            try:
+                await super().__call__(p, data)
+            finally:
+                self.metrics.observe(time.perf_counter() - started)
         except CooldownError:
-            p.logger.debug(f'{p} tried to send a command during a cooldown')
+            p.logger.debug('%s tried to send a command during a cooldown', p)
         except ChecklistError:
-            p.logger.debug(f'{p} sent a command without meeting checklist requirements')
+            self.metrics.checklist_failures += 1
+            p.logger.debug('%s sent a command without meeting checklist requirements', p)
+        except Exception:
+            self.metrics.exceptions += 1
+            raise
 
 
 class _CommandGroup(_Command):
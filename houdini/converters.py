@@ -5,6 +5,7 @@ import itertools
 from abc import ABC, abstractmethod
 
 from houdini.cooldown import CooldownError
+from houdini.metrics import HandlerMetrics
 from houdini.data.igloo import Flooring, Furniture, Igloo, Location
 from houdini.data.item import Item
 from houdini.data.permission import Permission
@@ -17,11 +18,30 @@ class ChecklistError(Exception):
     """Raised when a checklist fails"""
 
 
+class _DecoderStep:
+
+    __slots__ = ['kind', 'component', 'converter', 'plain', 'coroutine', 'string']
+
+    Default = object()
+
+    def __init__(self, kind, component, converter=None):
+        self.kind = kind
+        self.component = component
+        self.string = converter == str
+
+        if inspect.isclass(converter) and issubclass(converter, IConverter):
+            converter = converter()
+
+        self.plain = not isinstance(converter, IConverter)
+        self.converter = converter if self.plain else converter.convert
+        self.coroutine = not self.plain and asyncio.iscoroutinefunction(self.converter)
+
+
 class _ArgumentDeserializer:
     __slots__ = ['name', 'components', 'callback', 'parent', 'pass_raw', 'cooldown',
-                 'checklist', 'instance', 'alias', 'rest_raw', 'string_delimiter',
+                 'checklist', '_instance', 'alias', 'rest_raw', 'string_delimiter',
                  'string_separator', '_signature', '_arguments', '_exception_callback',
-                 '_exception_class']
+                 '_exception_class', '_decoder', '_keyword_count', 'metrics']
 
     def __init__(self, name, callback, **kwargs):
         self.callback = callback
@@ -33,10 +53,12 @@ class _ArgumentDeserializer:
         self.string_delimiter = kwargs.get('string_delimiter', [])
         self.string_separator = kwargs.get('string_separator', str())
 
-        self.instance = None
+        self._instance = None
+        self.metrics = HandlerMetrics()
 
         self._signature = list(inspect.signature(self.callback).parameters.values())
         self._arguments = inspect.getfullargspec(self.callback)
+        self._keyword_count = len(self._arguments.kwonlyargs)
 
         self._exception_callback = None
         self._exception_class = Exception
@@ -44,6 +66,27 @@ class _ArgumentDeserializer:
         if self.rest_raw:
             self._signature = self._signature[:-1]
 
+        self._compile_decoder()
+
+    @property
+    def instance(self):
+        return self._instance
+
+    @instance.setter
+    def instance(self, instance):
+        self._instance = instance
+        self._compile_decoder()
+
+    def _compile_decoder(self):
+        decoder = []
+        for component in itertools.islice(self._signature, 1 if self._instance is None else 2, len(self._signature)):
+            if component.annotation is component.empty and component.default is not component.empty:
+                decoder.append(_DecoderStep(_DecoderStep.Default, component))
+            elif component.kind in (component.POSITIONAL_OR_KEYWORD, component.VAR_POSITIONAL,
+                                    component.KEYWORD_ONLY):
+                decoder.append(_DecoderStep(component.kind, component, get_converter(component)))
+        self._decoder = tuple(decoder)
+
     def _can_run(self, p):
         return True if not self.checklist else all(predicate(self, p) for predicate in self.checklist)
 
@@ -51,6 +94,7 @@ class _ArgumentDeserializer:
         if self.cooldown is not None:
             bucket = self.cooldown.get_bucket(p)
             if bucket.is_cooling:
+                self.cooldown.throttled += 1
                 if self.cooldown.callback is not None:
                     if self.instance:
                         await self.cooldown.callback(self.instance, p)
@@ -74,50 +118,49 @@ class _ArgumentDeserializer:
             self._exception_class = exception_class
         return decorator
 
+    async def _convert(self, step, ctx):
+        if step.string:
+            self._consume_separated_string(ctx)
+
+        if step.plain:
+            return step.converter(ctx.argument)
+        if step.coroutine:
+            return await step.converter(ctx)
+        return step.converter(ctx)
+
     async def _deserialize(self, p, data):
-        handler_call_arguments = [self.instance, p] if self.instance is not None else [p]
+        handler_call_arguments = [self._instance, p] if self._instance is not None else [p]
         handler_call_keywords = {}
 
-        arguments = itertools.islice(data, len(data) - len(self._arguments.kwonlyargs))
-        keyword_arguments = itertools.islice(data, len(data) - len(self._arguments.kwonlyargs), len(data))
+        positional_count = len(data) - self._keyword_count
+        arguments = itertools.islice(data, positional_count)
+        keyword_arguments = itertools.islice(data, positional_count, len(data))
 
         ctx = _ConverterContext(None, arguments, None, p)
-        for ctx.component in itertools.islice(self._signature, len(handler_call_arguments), len(self._signature)):
-            if ctx.component.annotation is ctx.component.empty and ctx.component.default is not ctx.component.empty:
-                handler_call_arguments.append(ctx.component.default)
-            elif ctx.component.kind == ctx.component.POSITIONAL_OR_KEYWORD:
+        for step in self._decoder:
+            ctx.component = step.component
+            if step.kind is _DecoderStep.Default:
+                handler_call_arguments.append(step.component.default)
+            elif step.kind == step.component.POSITIONAL_OR_KEYWORD:
                 ctx.argument = next(ctx.arguments, None)
 
                 if ctx.argument is None:
-                    if ctx.component.default is not ctx.component.empty:
-                        handler_call_arguments.append(ctx.component.default)
+                    if step.component.default is not step.component.empty:
+                        handler_call_arguments.append(step.component.default)
                     else:
                         raise StopIteration
+                elif step.plain and not step.string:
+                    handler_call_arguments.append(step.converter(ctx.argument))
                 else:
-                    converter = get_converter(ctx.component)
-
-                    if converter == str:
-                        self._consume_separated_string(ctx)
-
-                    handler_call_arguments.append(await do_conversion(converter, ctx))
-            elif ctx.component.kind == ctx.component.VAR_POSITIONAL:
+                    handler_call_arguments.append(await self._convert(step, ctx))
+            elif step.kind == step.component.VAR_POSITIONAL:
                 for argument in ctx.arguments:
                     ctx.argument = argument
-                    converter = get_converter(ctx.component)
-
-                    if converter == str:
-                        self._consume_separated_string(ctx)
-
-                    handler_call_arguments.append(await do_conversion(converter, ctx))
-            elif ctx.component.kind == ctx.component.KEYWORD_ONLY:
+                    handler_call_arguments.append(await self._convert(step, ctx))
+            elif step.kind == step.component.KEYWORD_ONLY:
                 ctx.arguments = keyword_arguments
                 ctx.argument = next(keyword_arguments)
-                converter = get_converter(ctx.component)
-
-                if converter == str:
-                    self._consume_separated_string(ctx)
-
-                handler_call_keywords[ctx.component.name] = await do_conversion(converter, ctx)
+                handler_call_keywords[step.component.name] = await self._convert(step, ctx)
 
         if self.rest_raw:
             handler_call_arguments.append(list(ctx.arguments))
@@ -29,7 +29,7 @@ class _Cooldown:
 
     @property
     def is_cooling(self):
-        current = time.time()
+        current = time.monotonic()
         self.last = current
 
         if self._tokens == self.rate:
@@ -56,32 +56,24 @@ class _Cooldown:
 
 class _CooldownMapping:
 
-    __slots__ = ['_cooldown', '_cache', 'callback']
+    __slots__ = ['_cooldown', '_cache', 'callback', 'throttled']
 
     def __init__(self, callback, cooldown_object):
         self._cooldown = cooldown_object
 
         self.callback = callback
+        self.throttled = 0
 
         self._cache = {}
 
-    def _get_bucket_key(self, p):
-        if self._cooldown.bucket_type == BucketType.Default:
-            return p.id
-        return p.server
-
-    def _verify_cache_integrity(self):
-        current = time.time()
-        self._cache = {cache_key: bucket for cache_key, bucket in
-                       self._cache.items() if current < bucket.last + bucket.per}
-
     def get_bucket(self, p):
-        self._verify_cache_integrity()
-        cache_key = self._get_bucket_key(p)
-        if cache_key not in self._cache:
-            bucket = self._cooldown.copy()
-            self._cache[cache_key] = bucket
+        if self._cooldown.bucket_type == BucketType.Server:
+            cache, cache_key = self._cache, p.server
         else:
-            bucket = self._cache[cache_key]
-        return bucket
+            cache, cache_key = p.cooldowns, self
 
+        try:
+            return cache[cache_key]
+        except KeyError:
+            bucket = cache[cache_key] = self._cooldown.copy()
+            return bucket
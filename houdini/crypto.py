@@ -1,6 +1,12 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from hashlib import md5
 from secrets import token_hex
 
+import bcrypt
+
 
 class Crypto:
 
@@ -33,3 +39,53 @@ class Crypto:
         login_hash = Crypto.encrypt_password(key)
 
         return login_hash
+
+
+class VerificationQueueFull(Exception):
+    """Raised when too many password verifications are already waiting on the pool"""
+
+
+class PasswordVerifier:
+    """Checks bcrypt hashes on a dedicated, bounded thread or process pool and records how long each check takes"""
+
+    def __init__(self, pool='thread', workers=None, queue_size=64):
+        self.executor = ProcessPoolExecutor(workers) if pool == 'process' else \
+            ThreadPoolExecutor(workers, thread_name_prefix='bcrypt')
+        self.queue_size = queue_size
+
+        self.pending = 0
+        self.verifications = 0
+        self.rejections = 0
+        self.timings = deque(maxlen=1024)
+
+    @property
+    def saturated(self):
+        return self.pending >= self.queue_size
+
+    async def verify(self, password, hashed_password):
+        if self.saturated:
+            self.rejections += 1
+            raise VerificationQueueFull()
+
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_event_loop().run_in_executor(
+                self.executor, bcrypt.checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+        finally:
+            self.pending -= 1
+            self.verifications += 1
+            self.timings.append(time.perf_counter() - started)
+
+    def get_stats(self):
+        timings = sorted(self.timings)
+        return {
+            'pending': self.pending,
+            'verifications': self.verifications,
+            'rejections': self.rejections,
+            'p50': timings[len(timings) // 2] if timings else 0.0,
+            'p99': timings[int(len(timings) * .99)] if timings else 0.0
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
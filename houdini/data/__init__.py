@@ -1,12 +1,17 @@
+import asyncio
 from collections.abc import Mapping
 
 from gino import Gino
+from sqlalchemy.dialects.postgresql import insert
 
 db = Gino()
 
 
 class AbstractDataCollection(Mapping):
 
+    penguin_collections = {}
+    fetch_limit = None
+
     def __init__(self, filter_lookup=None):
         self.__collection = dict()
 
@@ -40,22 +45,84 @@ class AbstractDataCollection(Mapping):
         self.__collection[key] = model_instance
         return model_instance
 
+    async def insert_many(self, rows):
+        """Inserts many rows in one statement, skipping rows which already exist in the database"""
+        if not rows:
+            return []
+
+        rows = [{self.__filterby: self.__filter_lookup, **row} for row in rows]
+        query = insert(self.__model).values(rows).on_conflict_do_nothing()
+        query = query.returning(*self.__model.__table__.columns)
+        model_instances = await query.gino.load(self.__model).all()
+
+        for model_instance in model_instances:
+            self.__collection[getattr(model_instance, self.__indexby)] = model_instance
+        return model_instances
+
     async def delete(self, key):
         model_instance = self.__collection.pop(key)
         await model_instance.delete()
 
-    async def __collect(self):
+    async def delete_many(self, keys):
+        """Deletes many items from this collection in one statement"""
+        keys = [key for key in keys if self.__collection.pop(key, None) is not None]
+        if keys:
+            filter_column = getattr(self.__model, self.__filterby)
+            index_column = getattr(self.__model, self.__indexby)
+            await self.__model.delete.where((filter_column == self.__filter_lookup)
+                                            & (index_column.in_(keys))).gino.status()
+
+    def __query(self):
         filter_column = getattr(self.__model, self.__filterby)
-        query = self.__model.query.where(filter_column == self.__filter_lookup)
+        return self.__model.query.where(filter_column == self.__filter_lookup)
 
+    async def __collect(self):
         async with db.transaction():
-            collected = query.gino.iterate()
+            collected = self.__query().gino.iterate()
             async for model_instance in collected:
                 collection_index = getattr(model_instance, self.__indexby)
                 self.__collection[collection_index] = model_instance
 
+    async def __fetch(self):
+        for model_instance in await self.__query().gino.all():
+            collection_index = getattr(model_instance, self.__indexby)
+            self.__collection[collection_index] = model_instance
+
     @classmethod
     async def get_collection(cls, *args, **kwargs):
         cc = cls(*args, **kwargs)
         await cc.__collect()
         return cc
+
+    @classmethod
+    async def fetch_collection(cls, *args, **kwargs):
+        """Loads a small collection with a single query instead of a cursor inside a transaction"""
+        cc = cls(*args, **kwargs)
+        await cc.__fetch()
+        return cc
+
+    @classmethod
+    def limit_fetches(cls, pool_size):
+        """Lets collection loads across every login hold at most a quarter of the connection pool at once"""
+        cls.fetch_limit = asyncio.Semaphore(max(1, pool_size // 4))
+
+    @classmethod
+    async def get_penguin_collections(cls, penguin_id):
+        """Loads every registered per-penguin collection concurrently, keyed by penguin attribute"""
+        async def fetch(collection_cls):
+            if cls.fetch_limit is None:
+                return await collection_cls.fetch_collection(penguin_id)
+            async with cls.fetch_limit:
+                return await collection_cls.fetch_collection(penguin_id)
+
+        collections = await asyncio.gather(*(fetch(collection_cls)
+                                             for collection_cls in cls.penguin_collections.values()))
+        return dict(zip(cls.penguin_collections.keys(), collections))
+
+
+def penguin_collection(attribute):
+    """Registers a per-penguin collection to be loaded onto the given penguin attribute at world login"""
+    def register(collection_cls):
+        AbstractDataCollection.penguin_collections[attribute] = collection_cls
+        return collection_cls
+    return register
@@ -1,4 +1,4 @@
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class BuddyList(db.Model):
@@ -45,18 +45,21 @@ class CharacterBuddy(db.Model):
     best_buddy = db.Column(db.Boolean, nullable=False, server_default=db.text("false"))
 
 
+@penguin_collection('buddies')
 class BuddyListCollection(AbstractDataCollection):
     __model__ = BuddyList
     __filterby__ = 'penguin_id'
     __indexby__ = 'buddy_id'
 
 
+@penguin_collection('ignore')
 class IgnoreListCollection(AbstractDataCollection):
     __model__ = IgnoreList
     __filterby__ = 'penguin_id'
     __indexby__ = 'ignore_id'
 
 
+@penguin_collection('buddy_requests')
 class BuddyRequestCollection(AbstractDataCollection):
     __model__ = BuddyRequest
     __filterby__ = 'penguin_id'
@@ -69,6 +72,7 @@ class CharacterCollection(AbstractDataCollection):
     __indexby__ = 'id'
 
 
+@penguin_collection('character_buddies')
 class CharacterBuddyCollection(AbstractDataCollection):
     __model__ = CharacterBuddy
     __filterby__ = 'penguin_id'
@@ -1,6 +1,6 @@
 from functools import cached_property
 
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class Flooring(db.Model):
@@ -128,6 +128,7 @@ class IglooCollection(AbstractDataCollection):
         return [item for item in self.values() if item.vanilla_inventory]
 
 
+@penguin_collection('igloos')
 class PenguinIglooCollection(AbstractDataCollection):
     __model__ = PenguinIgloo
     __indexby__ = 'igloo_id'
@@ -148,6 +149,7 @@ class LocationCollection(AbstractDataCollection):
         return [item for item in self.values() if item.vanilla_inventory]
 
 
+@penguin_collection('locations')
 class PenguinLocationCollection(AbstractDataCollection):
     __model__ = PenguinLocation
     __indexby__ = 'location_id'
@@ -172,6 +174,7 @@ class FurnitureCollection(AbstractDataCollection):
         return [item for item in self.values() if item.vanilla_inventory]
 
 
+@penguin_collection('furniture')
 class PenguinFurnitureCollection(AbstractDataCollection):
     __model__ = PenguinFurniture
     __indexby__ = 'furniture_id'
@@ -192,6 +195,7 @@ class FlooringCollection(AbstractDataCollection):
         return [item for item in self.values() if item.vanilla_inventory]
 
 
+@penguin_collection('flooring')
 class PenguinFlooringCollection(AbstractDataCollection):
     __model__ = PenguinFlooring
     __indexby__ = 'flooring_id'
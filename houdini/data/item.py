@@ -1,6 +1,6 @@
 from functools import cached_property
 
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class Item(db.Model):
@@ -83,6 +83,7 @@ class ItemCollection(AbstractDataCollection):
         return { item for item in self.values() if item.vanilla_inventory }
 
 
+@penguin_collection('inventory')
 class PenguinItemCollection(AbstractDataCollection):
     __model__ = PenguinItem
     __indexby__ = 'item_id'
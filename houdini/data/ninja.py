@@ -1,4 +1,4 @@
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class Card(db.Model):
@@ -59,6 +59,7 @@ class CardCollection(AbstractDataCollection):
         return [card for card in self.values() if card.power_id > 0]
 
 
+@penguin_collection('cards')
 class PenguinCardCollection(AbstractDataCollection):
     __model__ = PenguinCard
     __indexby__ = 'card_id'
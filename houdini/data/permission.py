@@ -1,4 +1,4 @@
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class Permission(db.Model):
@@ -34,6 +34,7 @@ class PermissionCollection(AbstractDataCollection):
                 await self.delete(permission.name)
 
 
+@penguin_collection('permissions')
 class PenguinPermissionCollection(AbstractDataCollection):
     __model__ = PenguinPermission
     __indexby__ = 'permission_name'
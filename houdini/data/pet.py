@@ -1,4 +1,4 @@
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class Puffle(db.Model):
@@ -92,6 +92,7 @@ class PuffleCollection(AbstractDataCollection):
     __filterby__ = 'id'
 
 
+@penguin_collection('puffles')
 class PenguinPuffleCollection(AbstractDataCollection):
     __model__ = PenguinPuffle
     __indexby__ = 'id'
@@ -104,6 +105,7 @@ class PuffleItemCollection(AbstractDataCollection):
     __filterby__ = 'id'
 
 
+@penguin_collection('puffle_items')
 class PenguinPuffleItemCollection(AbstractDataCollection):
     __model__ = PenguinPuffleItem
     __indexby__ = 'item_id'
@@ -1,4 +1,4 @@
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class PluginAttribute(db.Model):
@@ -18,6 +18,7 @@ class PenguinAttribute(db.Model):
     value = db.Column(db.Text)
 
 
+@penguin_collection('attributes')
 class PenguinAttributeCollection(AbstractDataCollection):
     __model__ = PenguinAttribute
     __indexby__ = 'name'
@@ -1,6 +1,10 @@
 import random
 
-from houdini.data import AbstractDataCollection, db
+from houdini import encode_xt
+from houdini.data import AbstractDataCollection, db, penguin_collection
+
+
+SpawnAttempts = 8
 
 
 def stealth_mod_filter(stealth_mod_id):
@@ -14,6 +18,9 @@ class RoomMixin:
     id = None
     max_users = None
 
+    bus = None
+    bus_key = None
+
     def __init__(self, *args, **kwargs):
         self.penguins_by_id = {}
         self.penguins_by_username = {}
@@ -25,46 +32,120 @@ class RoomMixin:
         self.tables = {}
         self.waddles = {}
 
+        self._positions = {}
+        self._occupied_positions = {}
+
+        self._penguin_strings = {}
+        self._string = None
+
     async def add_penguin(self, p):
         if p.room:
             await p.room.remove_penguin(p)
+        self.bus = p.server.bus
         self.penguins_by_id[p.id] = p
         self.penguins_by_username[p.username] = p
 
         if p.character:
             self.penguins_by_character_id[p.character] = p
 
-        player_positions = {(penguin.x, penguin.y) for penguin in self.penguins_by_id.values()}
-        free_positions = [(tx, ty) for tx in range(p.x - self.max_users // 4, p.x + self.max_users // 4)
-                          for ty in range(p.y - self.max_users // 4, p.y + self.max_users // 4)
-                          if (tx, ty) not in player_positions]
-
-        p.x, p.y = random.choice(free_positions)
+        self.move_penguin(p, *self.get_spawn_position(p.x, p.y))
         p.room = self
 
+        self.invalidate_string(p)
+
+        if self.bus is not None and self.bus_key is not None:
+            await self.bus.join_room(self, p)
+
     async def remove_penguin(self, p):
         if not p.stealth_moderator:
-            await self.send_xt('rp', p.id, f=lambda penguin: penguin.id != p.id)
+            await self.send_xt('rp', p.id, f=lambda penguin: penguin.id != p.id, remote=True)
 
         del self.penguins_by_id[p.id]
         del self.penguins_by_username[p.username]
+        self.__release_position(p)
 
         if p.character:
             del self.penguins_by_character_id[p.character]
 
+        self.invalidate_string(p)
+
+        if self.bus is not None and self.bus_key is not None:
+            await self.bus.leave_room(self, p)
+
         p.room = None
         p.frame = 1
         p.toy = None
 
+    def get_spawn_position(self, x, y):
+        """
+        Picks a random unoccupied spot in the square around (x, y). Occupants fill at most a small
+        fraction of the square, so sampling finds a free spot in a couple of tries and the square is
+        only enumerated when it's nearly full.
+        """
+        radius = self.max_users // 4
+        for _ in range(SpawnAttempts):
+            position = (random.randrange(x - radius, x + radius), random.randrange(y - radius, y + radius))
+            if position != (x, y) and position not in self._occupied_positions:
+                return position
+
+        return random.choice([(tx, ty) for tx in range(x - radius, x + radius) for ty in range(y - radius, y + radius)
+                              if (tx, ty) != (x, y) and (tx, ty) not in self._occupied_positions])
+
+    def move_penguin(self, p, x, y):
+        p.x, p.y = x, y
+        if p.id in self.penguins_by_id:
+            self.__release_position(p)
+            self._positions[p.id] = (x, y)
+            self._occupied_positions[x, y] = self._occupied_positions.get((x, y), 0) + 1
+
+    def __release_position(self, p):
+        position = self._positions.pop(p.id, None)
+        if position is not None:
+            if self._occupied_positions[position] > 1:
+                self._occupied_positions[position] -= 1
+            else:
+                del self._occupied_positions[position]
+
     async def refresh(self, p):
-        await p.send_xt('grs', self.id, await self.get_string(f=stealth_mod_filter(p.id)))
+        await p.send_xt('grs', self.id, await self.get_visible_string(p))
+
+    def invalidate_string(self, p):
+        self._penguin_strings.pop(p.id, None)
+        self._string = None
+
+        if self.bus is not None and self.bus_key is not None and p.id in self.penguins_by_id:
+            self.bus.update_occupant(self, p)
+
+    async def get_penguin_string(self, p):
+        if p.id not in self._penguin_strings:
+            self._penguin_strings[p.id] = await p.string
+        return self._penguin_strings[p.id]
 
     async def get_string(self, f=None):
-        return '%'.join([await p.string for p in filter(f, self.penguins_by_id.values())])
+        return '%'.join([await self.get_penguin_string(p) for p in filter(f, self.penguins_by_id.values())])
 
-    async def send_xt(self, *data, f=None):
+    async def get_visible_string(self, p):
+        """Room string as seen by p, stealth moderators are only visible to themselves"""
+        if self._string is None:
+            self._string = await self.get_string(f=lambda penguin: not penguin.stealth_moderator)
+
+        strings = [self._string] if self._string else []
+        if self.bus is not None and self.bus_key is not None:
+            strings += self.bus.get_remote_strings(self)
+        if p.stealth_moderator and p.id in self.penguins_by_id:
+            strings.append(await self.get_penguin_string(p))
+        return '%'.join(strings)
+
+    def send_encoded(self, line, f=None):
         for penguin in filter(f, self.penguins_by_id.values()):
-            await penguin.send_xt(*data)
+            penguin.send_encoded(line)
+
+    async def send_xt(self, *data, f=None, remote=None):
+        line = encode_xt(*data)
+        self.send_encoded(line, f=f)
+
+        if self.bus is not None and self.bus_key is not None and (f is None if remote is None else remote):
+            await self.bus.send_room_line(self, line)
 
 
 class PenguinBackyardRoom(RoomMixin):
@@ -125,6 +206,10 @@ class Room(db.Model, RoomMixin):
 
         self.blackhole_penguins = {}
 
+    @property
+    def bus_key(self):
+        return f'room.{self.id}'
+
     async def add_penguin(self, p):
         if len(self.penguins_by_id) >= self.max_users and not p.moderator:
             return await p.send_error(210)
@@ -139,9 +224,9 @@ class Room(db.Model, RoomMixin):
         if self.game:
             await p.send_xt('jg', self.id)
         else:
-            await p.send_xt('jr', self.id, await self.get_string(f=stealth_mod_filter(p.id)))
+            await p.send_xt('jr', self.id, await self.get_visible_string(p))
             if not p.stealth_moderator:
-                await self.send_xt('ap', await p.string)
+                await self.send_xt('ap', await self.get_penguin_string(p))
 
     async def remove_penguin(self, p):
         await RoomMixin.remove_penguin(self, p)
@@ -182,15 +267,19 @@ class PenguinIglooRoom(db.Model, RoomMixin):
     def external_id(self):
         return self.penguin_id + PenguinIglooRoom.internal_id
 
+    @property
+    def bus_key(self):
+        return f'igloo.{self.penguin_id}'
+
     async def add_penguin(self, p):
         if len(self.penguins_by_id) >= self.max_users and not p.moderator:
             return await p.send_error(210)
 
         await RoomMixin.add_penguin(self, p)
 
-        await p.send_xt('jr', self.external_id, await self.get_string(f=stealth_mod_filter(p.id)))
+        await p.send_xt('jr', self.external_id, await self.get_visible_string(p))
         if not p.stealth_moderator:
-            await self.send_xt('ap', await p.string)
+            await self.send_xt('ap', await self.get_penguin_string(p))
 
         p.server.igloos_by_penguin_id[self.penguin_id] = self
 
@@ -263,8 +352,9 @@ class RoomTable(db.Model):
         return '%'.join([player_one.safe_name, player_two.safe_name, self.logic.get_string(), '1'])
 
     async def send_xt(self, *data):
+        line = encode_xt(*data)
         for penguin in self.penguins:
-            await penguin.send_xt(*data)
+            penguin.send_encoded(line)
 
 
 class RoomWaddle(db.Model):
@@ -322,6 +412,7 @@ class RoomWaddle(db.Model):
         return self.penguins.index(p)
 
 
+@penguin_collection('igloo_rooms')
 class PenguinIglooRoomCollection(AbstractDataCollection):
     __model__ = PenguinIglooRoom
     __indexby__ = 'id'
@@ -1,4 +1,4 @@
-from houdini.data import AbstractDataCollection, db
+from houdini.data import AbstractDataCollection, db, penguin_collection
 
 
 class Stamp(db.Model):
@@ -62,6 +62,7 @@ class StampCollection(AbstractDataCollection):
     __filterby__ = 'id'
 
 
+@penguin_collection('stamps')
 class PenguinStampCollection(AbstractDataCollection):
     __model__ = PenguinStamp
     __indexby__ = 'stamp_id'
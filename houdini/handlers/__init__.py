@@ -1,6 +1,8 @@
 import enum
 import inspect
 import itertools
+import sys
+import time
 from types import FunctionType
 
 from houdini import _AbstractManager, get_package_modules, plugins
@@ -88,11 +90,21 @@ class _XTListener(_Listener):
                 await super()._check_cooldown(p)
                 super()._check_list(p)
 
-                await super().__call__(p, packet_data)
+                started = time.perf_counter()
+                try:
+                    await super().__call__(p, packet_data)
+                finally:
+                    self.metrics.observe(time.perf_counter() - started)
         except CooldownError:
-            p.logger.debug(f'{p} tried to send a packet during a cooldown')
+            p.logger.debug('%s tried to send a packet during a cooldown', p)
         except ChecklistError:
-            p.logger.debug(f'{p} sent a packet without meeting checklist requirements')
+            self.metrics.checklist_failures += 1
+            p.logger.debug('%s sent a packet without meeting checklist requirements', p)
+        except (AuthorityError, AbortHandlerChain):
+            raise
+        except Exception:
+            self.metrics.exceptions += 1
+            raise
 
 
 class _XMLListener(_Listener):
@@ -107,19 +119,30 @@ class _XMLListener(_Listener):
 
             handler_call_arguments = [self.instance, p] if self.instance is not None else [p]
 
-            ctx = _ConverterContext(None, None, packet_data, p)
-            for ctx.component in itertools.islice(self._signature, len(handler_call_arguments), len(self._signature)):
-                if ctx.component.default is not ctx.component.empty:
-                    handler_call_arguments.append(ctx.component.default)
-                elif ctx.component.kind == ctx.component.POSITIONAL_OR_KEYWORD:
-                    converter = get_converter(ctx.component)
-
-                    handler_call_arguments.append(await do_conversion(converter, ctx))
-            return await self.callback(*handler_call_arguments)
+            started = time.perf_counter()
+            try:
+                ctx = _ConverterContext(None, None, packet_data, p)
+                for ctx.component in itertools.islice(self._signature, len(handler_call_arguments),
+                                                      len(self._signature)):
+                    if ctx.component.default is not ctx.component.empty:
+                        handler_call_arguments.append(ctx.component.default)
+                    elif ctx.component.kind == ctx.component.POSITIONAL_OR_KEYWORD:
+                        converter = get_converter(ctx.component)
+
+                        handler_call_arguments.append(await do_conversion(converter, ctx))
+                return await self.callback(*handler_call_arguments)
+            finally:
+                self.metrics.observe(time.perf_counter() - started)
         except CooldownError:
-            p.logger.debug(f'{p} tried to send a packet during a cooldown')
+            p.logger.debug('%s tried to send a packet during a cooldown', p)
         except ChecklistError:
-            p.logger.debug(f'{p} sent a packet without meeting checklist requirements')
+            self.metrics.checklist_failures += 1
+            p.logger.debug('%s sent a packet without meeting checklist requirements', p)
+        except (AuthorityError, AbortHandlerChain):
+            raise
+        except Exception:
+            self.metrics.exceptions += 1
+            raise
 
 
 class _DummyListener(_Listener):
@@ -186,6 +209,19 @@ class _ListenerManager(_AbstractManager):
 class XTListenerManager(_ListenerManager):
     ListenerClass = _XTListener
 
+    def __init__(self, server):
+        self.lookup = {}
+
+        super().__init__(server)
+
+    async def load(self, module):
+        await super().load(module)
+
+        self.lookup = {}
+        for packet, listeners in self.items():
+            ext, packet_id = packet.id.split('%', 1)
+            self.lookup[sys.intern(ext), sys.intern(packet_id)] = (packet, listeners)
+
 
 class XMLListenerManager(_ListenerManager):
     ListenerClass = _XMLListener
@@ -102,9 +102,7 @@ async def handle_get_game_over(p, score: int):
                 coins_earned *= 2
 
         if not is_card_jitsu:
-            await p.update(
-                coins=min(p.coins + coins_earned, p.server.config.max_coins)
-            ).apply()
+            await p.apply_update(coins=min(p.coins + coins_earned, p.server.config.max_coins))
         await p.send_xt("zo", p.coins, *stamp_info)
 
 
@@ -148,8 +146,8 @@ async def handle_get_game_again(p):
 @handlers.cooldown(5)
 async def handle_game_complete(p, medals: int):
     medals = min(6, medals)
-    await p.update(career_medals=p.career_medals + medals,
-                   agent_medals=p.agent_medals + medals).apply()
+    await p.apply_update(career_medals=p.career_medals + medals,
+                         agent_medals=p.agent_medals + medals)
 
 
 @handlers.disconnected
@@ -4,7 +4,7 @@ import random
 import time
 from dataclasses import dataclass
 
-from houdini import handlers
+from houdini import encode_xt, handlers
 from houdini.data.dance import DanceSongCollection
 from houdini.handlers import XTPacket
 from houdini.penguin import Penguin
@@ -89,8 +89,9 @@ class DanceFloor:
         self._next_song_timestamp = int(round(time.time() * 1000)) + self._current_track.song_length_millis
 
     async def send_xt(self, *data):
+        line = encode_xt(*data)
         for dancer in self._dancers.values():
-            await dancer.penguin.send_xt(*data)
+            dancer.penguin.send_encoded(line)
 
     def set_difficulty(self, p, difficulty):
         self._queue[p.id].difficulty = max(0, min(difficulty, DanceFloor.Expert))
@@ -1,8 +1,41 @@
+import asyncio
+from functools import lru_cache
+
 from houdini import handlers
 from houdini.constants import ClientType
 from houdini.converters import VersionChkConverter
 from houdini.data.buddy import BuddyList
 from houdini.handlers import XMLPacket
+from houdini.smartfox import encode_xml
+
+ApiOK = encode_xml({'body': {'action': 'apiOK', 'r': '0'}})
+ApiKO = encode_xml({'body': {'action': 'apiKO', 'r': '0'}})
+
+
+# Returns one character per world key, '1' if any of the buddy ids in ARGV is a member of that world's player set
+BuddyWorldsScript = """
+local bitmap = {}
+for index, server_key in ipairs(KEYS) do
+    bitmap[index] = '0'
+    for _, buddy_id in ipairs(ARGV) do
+        if redis.call('SISMEMBER', server_key, buddy_id) == 1 then
+            bitmap[index] = '1'
+            break
+        end
+    end
+end
+return table.concat(bitmap)
+"""
+
+
+@lru_cache
+def get_buddy_worlds_script(redis):
+    return redis.register_script(BuddyWorldsScript)
+
+
+@lru_cache
+def get_random_key_reply(auth_key):
+    return encode_xml({'body': {'action': 'rndK', 'r': '-1'}, 'k': auth_key})
 
 
 @handlers.handler(XMLPacket('verChk'))
@@ -17,23 +50,24 @@ async def handle_version_check(p, version: VersionChkConverter):
         p.client_type = p.server.config.default_client
 
     if p.client_type is None:
-        await p.send_xml({'body': {'action': 'apiKO', 'r': '0'}})
+        p.send_encoded(ApiKO)
         await p.close()
     else:
-        await p.send_xml({'body': {'action': 'apiOK', 'r': '0'}})
+        p.send_encoded(ApiOK)
 
 
 @handlers.handler(XMLPacket('rndK'))
 @handlers.allow_once
 async def handle_random_key(p, _):
-    await p.send_xml({'body': {'action': 'rndK', 'r': '-1'}, 'k': p.server.config.auth_key})
+    p.send_encoded(get_random_key_reply(p.server.config.auth_key))
 
 
 async def get_server_presence(p, pdata):
-    buddy_worlds = []
-    world_populations = []
+    population_query = p.server.redis.hgetall('houdini.population')
+    buddies_query = BuddyList.select('buddy_id').where(BuddyList.penguin_id == pdata.id).gino.all()
+    pops, buddies = await asyncio.gather(population_query, buddies_query)
 
-    pops = await p.server.redis.hgetall('houdini.population')
+    world_populations = []
     for server_id, server_population in pops.items():
         server_population = 7 if int(server_population) == p.server.config.capacity \
             else int(server_population) // (p.server.config.capacity // 6)
@@ -41,17 +75,13 @@ async def get_server_presence(p, pdata):
 
         world_populations.append(f'{int(server_id)},{int(server_population)}')
 
-        server_key = f'houdini.players.{int(server_id)}'
-        if await p.server.redis.scard(server_key):
-            async with p.server.db.transaction():
-                buddies = BuddyList.select('buddy_id').where(BuddyList.penguin_id == pdata.id).gino.iterate()
-                
-                async with p.server.redis.pipeline(transaction=True) as tr:
-                    async for buddy_id, in buddies:
-                        tr.sismember(server_key, buddy_id)
-                    online_buddies = await tr.execute()
-                    
-                if any(online_buddies):
-                    buddy_worlds.append(str(int(server_id)))
+    buddy_worlds = []
+    if buddies and pops:
+        server_ids = [int(server_id) for server_id in pops]
+        server_keys = [f'houdini.players.{server_id}' for server_id in server_ids]
+        buddy_worlds_script = get_buddy_worlds_script(p.server.redis)
+        buddy_world_bitmap = await buddy_worlds_script(keys=server_keys, args=[buddy_id for buddy_id, in buddies])
+        buddy_worlds = [str(server_id) for server_id, online in zip(server_ids, buddy_world_bitmap.decode())
+                        if online == '1']
 
     return '|'.join(world_populations), '|'.join(buddy_worlds)
@@ -1,14 +1,12 @@
-import asyncio
 import os
 from datetime import datetime, timedelta
 
-import bcrypt
 from sqlalchemy import func
 
 from houdini import handlers
 from houdini.constants import ClientType
 from houdini.converters import Credentials
-from houdini.crypto import Crypto
+from houdini.crypto import Crypto, VerificationQueueFull
 from houdini.data.moderator import Ban
 from houdini.data.penguin import Penguin
 from houdini.handlers import XMLPacket
@@ -20,19 +18,24 @@ from houdini.handlers.play.navigation import get_minutes_played_today
 @handlers.allow_once
 @handlers.depends_on_packet(XMLPacket('verChk'), XMLPacket('rndK'))
 async def handle_login(p, credentials: Credentials):
-    loop = asyncio.get_event_loop()
-
     username, password = credentials.username, credentials.password
     p.logger.info(f'{username} is logging in!')
 
+    if p.server.password_verifier.saturated:
+        p.logger.warning(f'{username} failed to login: password verification queue is full')
+        return await p.send_error_and_disconnect(103)
+
     data = await Penguin.query.where(func.lower(Penguin.username) == username).gino.first()
 
     if data is None:
         p.logger.info(f'{username} failed to login: penguin does not exist')
         return await p.send_error_and_disconnect(100)
 
-    password_correct = await loop.run_in_executor(None, bcrypt.checkpw,
-                                                  password.encode('utf-8'), data.password.encode('utf-8'))
+    try:
+        password_correct = await p.server.password_verifier.verify(password, data.password)
+    except VerificationQueueFull:
+        p.logger.warning(f'{username} failed to login: password verification queue is full')
+        return await p.send_error_and_disconnect(103)
 
     ip_addr = p.peer_name[0]
     flood_key = f'{ip_addr}.flood'
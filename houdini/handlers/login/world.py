@@ -4,6 +4,7 @@ from houdini import handlers
 from houdini.constants import ClientType
 from houdini.converters import Credentials, WorldCredentials
 from houdini.crypto import Crypto
+from houdini.data import AbstractDataCollection
 from houdini.data.moderator import Ban
 from houdini.data.penguin import Penguin
 from houdini.handlers import XMLPacket, login
@@ -13,7 +14,8 @@ handle_random_key = login.handle_random_key
 
 
 async def world_login(p, data):
-    if len(p.server.penguins_by_id) >= p.server.config.capacity:
+    population = len(p.server.penguins_by_id) if p.server.bus is None else await p.server.bus.get_population()
+    if population >= p.server.config.capacity:
         return await p.send_error_and_disconnect(103)
 
     if p.server.config.staff and not data.moderator:
@@ -31,9 +33,18 @@ async def world_login(p, data):
 
     if data.id in p.server.penguins_by_id:
         await p.server.penguins_by_id[data.id].close()
+        if p.server.write_behind is not None:
+            data = await Penguin.get(data.id)
+    elif p.server.bus is not None:
+        if await p.server.bus.kick(data.id) and p.server.write_behind is not None:
+            data = await Penguin.get(data.id)
 
     p.logger.info(f'{data.username} logged in successfully')
     p.update(**data.to_dict())
+
+    for attribute, collection in (await AbstractDataCollection.get_penguin_collections(p.id)).items():
+        setattr(p, attribute, collection)
+
     await p.send_xt('l')
 
 
@@ -7,4 +7,5 @@ from houdini.handlers import XTPacket
 @handlers.cooldown(1)
 async def handle_player_transformation(p, transform_id: int):
     p.avatar = transform_id
+    p.invalidate_string()
     await p.room.send_xt('spts', p.id, transform_id)
@@ -1,12 +1,18 @@
 from houdini import handlers
 from houdini.constants import ClientType
-from houdini.data.buddy import BuddyList, BuddyListCollection, BuddyRequest, BuddyRequestCollection, \
-    CharacterBuddyCollection, CharacterCollection
+from houdini.data.buddy import BuddyList, BuddyRequest, CharacterCollection
 from houdini.data.penguin import Penguin
-from houdini.handlers import Priority, XMLPacket, XTPacket
+from houdini.handlers import XTPacket
 from houdini.handlers.play.navigation import handle_join_room
 
 
+async def get_remote_buddies(p):
+    if p.server.bus is None:
+        return set()
+    return await p.server.bus.get_online(buddy_id for buddy_id in p.buddies.keys()
+                                         if buddy_id not in p.server.penguins_by_id)
+
+
 async def update_player_presence(p):
     for buddy_id in p.buddies.keys():
         if buddy_id in p.server.penguins_by_id:
@@ -15,6 +21,13 @@ async def update_player_presence(p):
                 await p.send_xt('bon', buddy.id, p.server.config.id, buddy.room.id)
                 await buddy.send_xt('bon', p.id, p.server.config.id, p.room.id)
 
+    for buddy_id in await get_remote_buddies(p):
+        location = await p.server.bus.locate(buddy_id)
+        if location is not None:
+            room_id, *_ = location
+            await p.send_xt('bon', buddy_id, p.server.config.id, room_id)
+            await p.server.bus.send_xt(buddy_id, 'bon', p.id, p.server.config.id, p.room.id)
+
     for character_id in p.character_buddies.keys():
         if character_id in p.server.penguins_by_character_id:
             character = p.server.penguins_by_character_id[character_id]
@@ -33,14 +46,6 @@ async def characters_load(server):
     server.logger.info(f'Loaded {len(server.characters)} characters')
 
 
-@handlers.handler(XMLPacket('login'), priority=Priority.Low)
-@handlers.allow_once
-async def load_buddy_inventory(p):
-    p.buddies = await BuddyListCollection.get_collection(p.id)
-    p.buddy_requests = await BuddyRequestCollection.get_collection(p.id)
-    p.character_buddies = await CharacterBuddyCollection.get_collection(p.id)
-
-
 @handlers.handler(XTPacket('j', 'jr'), after=handle_join_room, client=ClientType.Vanilla)
 async def handle_send_room_presence(p):
     await update_player_presence(p)
@@ -59,12 +64,14 @@ async def handle_get_buddies(p):
     characters = []
     best_characters = []
 
+    online_buddies = await get_remote_buddies(p)
+
     async with p.server.db.transaction():
         buddy_list = buddies_query.gino.iterate()
         buddy_requests = request_query.gino.iterate()
 
         async for buddy in buddy_list:
-            buddy_presence = int(buddy.buddy_id in p.server.penguins_by_id)
+            buddy_presence = int(buddy.buddy_id in p.server.penguins_by_id or buddy.buddy_id in online_buddies)
             buddies.append(f'{buddy.buddy_id}|{buddy.parent.safe_nickname(p.server.config.lang)}|{buddy_presence}')
 
             if buddy.best_buddy:
@@ -104,11 +111,13 @@ async def handle_get_buddies_legacy(p):
 
     buddies = []
 
+    online_buddies = await get_remote_buddies(p)
+
     async with p.server.db.transaction():
         buddy_list = buddies_query.gino.iterate()
 
         async for buddy in buddy_list:
-            buddy_presence = int(buddy.buddy_id in p.server.penguins_by_id)
+            buddy_presence = int(buddy.buddy_id in p.server.penguins_by_id or buddy.buddy_id in online_buddies)
             buddies.append(f'{buddy.buddy_id}|{buddy.parent.safe_nickname(p.server.config.lang)}|{buddy_presence}')
 
     await p.send_xt('gb', *buddies)
@@ -120,6 +129,11 @@ async def handle_find_buddy(p, buddy_id: int):
     if buddy_id in p.buddies and buddy_id in p.server.penguins_by_id:
         buddy = p.server.penguins_by_id[buddy_id]
         await p.send_xt('bf', buddy.room.external_id if buddy.room.igloo else buddy.room.id)
+    elif buddy_id in p.buddies and p.server.bus is not None:
+        location = await p.server.bus.locate(buddy_id)
+        if location is not None:
+            *_, external_id = location
+            await p.send_xt('bf', external_id)
 
 
 @handlers.handler(XTPacket('b', 'br'))
@@ -225,3 +239,6 @@ async def handle_disconnect_buddy(p):
     for buddy_id in p.buddies:
         if buddy_id in p.server.penguins_by_id:
             await p.server.penguins_by_id[buddy_id].send_xt('bof', p.id)
+
+    for buddy_id in await get_remote_buddies(p):
+        await p.server.bus.send_xt(buddy_id, 'bof', p.id)
@@ -1,8 +1,8 @@
 import random
 
 from houdini import handlers
-from houdini.data.ninja import CardCollection, CardStarterDeck, PenguinCardCollection
-from houdini.handlers import Priority, XMLPacket, XTPacket
+from houdini.data.ninja import CardCollection, CardStarterDeck
+from houdini.handlers import XTPacket
 
 
 @handlers.boot
@@ -15,12 +15,6 @@ async def cards_load(server):
     server.logger.info(f'Loaded {len(server.cards.starter_decks)} starter decks')
 
 
-@handlers.handler(XMLPacket('login'), priority=Priority.Low)
-@handlers.allow_once
-async def load_card_inventory(p):
-    p.cards = await PenguinCardCollection.get_collection(p.id)
-
-
 @handlers.handler(XTPacket('i', 'ai'))
 async def handle_buy_starter_deck(p, deck_id: int):
     if deck_id in p.server.cards.starter_decks:
@@ -46,7 +40,7 @@ async def handle_buy_power_cards(p):
         for card in power_cards:
             await p.add_card(card, member_quantity=1)
 
-        await p.update(coins=p.coins - 1500).apply()
+        await p.apply_update(flush=True, coins=p.coins - 1500)
         await p.send_xt('bpc', ','.join([str(card.id) for card in power_cards]), p.coins)
     else:
         await p.send_xt('bpc', 401)
@@ -37,7 +37,7 @@ async def handle_send_job_mail(p):
     first_day_of_month = today.replace(day=1)
     last_paycheck = last_paycheck.replace(day=1)
 
-    player_data = p.update()
+    coins = p.coins
     while last_paycheck < first_day_of_month:
         last_paycheck = last_paycheck + datetime.timedelta(days=32)
         last_paycheck = last_paycheck.replace(day=1)
@@ -48,16 +48,16 @@ async def handle_send_job_mail(p):
                 'postcard_id': 172,
                 'send_date': send_date
             })
-            player_data.update(coins=p.coins + 250)
+            coins += 250
         if p.agent_status:
             postcards.append({
                 'penguin_id': p.id,
                 'postcard_id': 184,
                 'send_date': send_date
             })
-            player_data.update(coins=p.coins + 350)
+            coins += 350
 
-    await player_data.update(last_paycheck=last_paycheck).apply()
+    await p.apply_update(flush=True, coins=coins, last_paycheck=last_paycheck)
     if postcards:
         await PenguinPostcard.insert().values(postcards).gino.status()
 
@@ -80,7 +80,7 @@ async def handle_get_field_op_status(p):
     today = datetime.date.today()
     monday = today - datetime.timedelta(days=today.weekday())
     if p.last_field_op.date() < monday:
-        await p.update(field_op_status=0).apply()
+        await p.apply_update(field_op_status=0)
     await p.send_xt('epfgf', p.field_op_status)
 
 
@@ -88,13 +88,12 @@ async def handle_get_field_op_status(p):
 @handlers.player_attribute(agent_status=True)
 async def handle_set_field_op_status(p, field_op_status: int):
     if 2 >= field_op_status == p.field_op_status + 1:
-        player_data = p.update(field_op_status=p.field_op_status + 1)
-        if p.field_op_status == 2:
-            player_data.update(career_medals=p.career_medals + 2)
-            player_data.update(agent_medals=p.agent_medals + 2)
+        player_data = {'field_op_status': p.field_op_status + 1, 'last_field_op': datetime.datetime.now()}
+        if player_data['field_op_status'] == 2:
+            player_data.update(career_medals=p.career_medals + 2, agent_medals=p.agent_medals + 2)
 
+        await p.apply_update(**player_data)
         await p.send_xt('epfsf', p.field_op_status)
-        await player_data.update(last_field_op=datetime.datetime.now()).apply()
 
 
 @handlers.handler(XTPacket('f', 'epfgr'))
@@ -121,11 +120,12 @@ async def handle_get_com_messages(p):
     unread_com_message = await EpfComMessage.query.where(
         EpfComMessage.date > p.com_message_read_date).gino.scalar()
     if unread_com_message:
-        p.server.cache.delete('com_messages')
+        await p.server.cache.delete('com_messages')
         await p.update(com_message_read_date=datetime.datetime.now()).apply()
-    com_messages = p.server.cache.get('com_messages')
-    com_messages = await get_com_messages(p) if com_messages is None else com_messages
-    p.server.cache.set('com_messages', com_messages)
+    com_messages = await p.server.cache.get('com_messages')
+    if com_messages is None:
+        com_messages = await get_com_messages(p)
+        await p.server.cache.fill('com_messages', com_messages)
     if com_messages:
         await p.send_xt('epfgm', int(bool(unread_com_message)), com_messages)
     else:
@@ -137,8 +137,8 @@ async def handle_get_com_messages(p):
 @handlers.player_attribute(agent_status=True)
 async def handle_epf_grant_reward(p, medals: int):
     medals = min(45, medals)
-    await p.update(career_medals=p.career_medals + medals,
-                   agent_medals=p.agent_medals + medals).apply()
+    await p.apply_update(career_medals=p.career_medals + medals,
+                         agent_medals=p.agent_medals + medals)
     await p.send_xt('epfgr', p.career_medals, p.agent_medals)
 
 
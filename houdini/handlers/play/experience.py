@@ -116,22 +116,24 @@ async def load_active_quests(p):
 @handlers.handler(XTPacket('j', 'js'), after=handle_join_server)
 @handlers.allow_once
 async def handle_quest_join_server(p):
-    p.server.cache.delete(f'quest.status.{p.id}')
+    await p.server.cache.delete(f'quest.status.{p.id}')
 
     await load_active_quests(p)
-    quest_settings = p.server.cache.get(f'quest.settings.{p.room.id}')
-    quest_status = p.server.cache.get(f'quest.status.{p.id}')
-    quest_settings = await get_quest_settings(p) if quest_settings is None else quest_settings
-    quest_status = await get_player_quest_status(p) if quest_status is None else quest_status
-    p.server.cache.set(f'quest.settings.{p.room.id}', quest_settings)
-    p.server.cache.set(f'quest.status.{p.id}', quest_status)
+    quest_settings = await p.server.cache.get(f'quest.settings.{p.room.id}')
+    if quest_settings is None:
+        quest_settings = await get_quest_settings(p)
+        await p.server.cache.fill(f'quest.settings.{p.room.id}', quest_settings)
+    quest_status = await p.server.cache.get(f'quest.status.{p.id}')
+    if quest_status is None:
+        quest_status = await get_player_quest_status(p)
+        await p.server.cache.fill(f'quest.status.{p.id}', quest_status)
 
     await p.send_xt('nxquestsettings', quest_settings)
     await p.send_xt('nxquestdata', quest_status)
 
 
 async def set_task_cleared(p, task_id):
-    p.server.cache.delete(f'quest.status.{p.id}')
+    await p.server.cache.delete(f'quest.status.{p.id}')
 
     await PenguinQuestTask.update.values(complete=True) \
         .where((PenguinQuestTask.task_id == task_id) &
@@ -162,7 +164,7 @@ async def handle_quest_join_player_room(p):
 
 @handlers.handler(XTPacket('nx', 'nxquestaward'))
 async def handle_quest_award(p, quest_id: int):
-    p.server.cache.delete(f'quest.status.{p.id}')
+    await p.server.cache.delete(f'quest.status.{p.id}')
 
     quest = await Quest.load(items=QuestAwardItem,
                              furniture=QuestAwardFurniture,
@@ -179,7 +181,7 @@ async def handle_quest_award(p, quest_id: int):
 @handlers.handler(XTPacket('nx', 'nxquestactivate'))
 @handlers.allow_once
 async def handle_quest_activate(p):
-    p.server.cache.delete(f'quest.status.{p.id}')
+    await p.server.cache.delete(f'quest.status.{p.id}')
 
     await init_all_quests(p)
     await p.send_xt('nxquestdata', await get_player_quest_status(p))
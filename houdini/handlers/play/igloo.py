@@ -1,3 +1,4 @@
+import asyncio
 import itertools
 import time
 from datetime import datetime, timedelta
@@ -11,10 +12,9 @@ from houdini.converters import SeparatorConverter
 from houdini.data import db
 from houdini.data.game import PenguinGameData
 from houdini.data.igloo import Flooring, FlooringCollection, Furniture, FurnitureCollection, Igloo, IglooCollection, \
-    IglooFurniture, IglooLike, Location, LocationCollection, PenguinFlooringCollection, PenguinFurnitureCollection, \
-    PenguinIglooCollection, PenguinLocationCollection
+    IglooFurniture, IglooLike, Location, LocationCollection
 from houdini.data.penguin import Penguin
-from houdini.data.room import PenguinIglooRoom, PenguinIglooRoomCollection
+from houdini.data.room import PenguinIglooRoom
 from houdini.handlers import Priority, XMLPacket, XTPacket
 from houdini.handlers.play.navigation import handle_join_server
 
@@ -35,35 +35,38 @@ async def get_igloo(penguin_id):
 
 async def get_active_igloo_string(p, penguin_id):
     igloo = await get_igloo(penguin_id)
-    furniture_string = p.server.cache.get(f'layout_furniture.{igloo.id}')
-    furniture_string = await get_layout_furniture(p, igloo.id) if furniture_string is None else furniture_string
-    like_count = p.server.cache.get(f'layout_like_count.{igloo.id}')
-    like_count = await get_layout_like_count(igloo.id) if like_count is None else like_count
-
-    p.server.cache.set(f'layout_furniture.{igloo.id}', furniture_string)
-    p.server.cache.set(f'layout_like_count.{igloo.id}', like_count)
+    furniture_string = await p.server.cache.get(f'layout_furniture.{igloo.id}')
+    if furniture_string is None:
+        furniture_string = await get_layout_furniture(p, igloo.id)
+        await p.server.cache.fill(f'layout_furniture.{igloo.id}', furniture_string)
+    like_count = await p.server.cache.get(f'layout_like_count.{igloo.id}')
+    if like_count is None:
+        like_count = await get_layout_like_count(igloo.id)
+        await p.server.cache.fill(f'layout_like_count.{igloo.id}', like_count)
     return f'{igloo.id}:1:0:{int(igloo.locked)}:{igloo.music}:{igloo.flooring}:' \
            f'{igloo.location}:{igloo.type}:{like_count}:{furniture_string}'
 
 
 async def get_legacy_igloo_string(p, penguin_id):
     igloo = await get_igloo(penguin_id)
-    furniture_string = p.server.cache.get(f'layout_furniture.{igloo.id}')
-    furniture_string = await get_layout_furniture(p, igloo.id) if furniture_string is None else furniture_string
-    p.server.cache.set(f'layout_furniture.{igloo.id}', furniture_string)
+    furniture_string = await p.server.cache.get(f'layout_furniture.{igloo.id}')
+    if furniture_string is None:
+        furniture_string = await get_layout_furniture(p, igloo.id)
+        await p.server.cache.fill(f'layout_furniture.{igloo.id}', furniture_string)
     return f'{igloo.type}%{igloo.music}%{igloo.flooring}%{furniture_string}'
 
 
 async def get_all_igloo_layouts(p):
     layout_details = []
     for slot, igloo in enumerate(p.igloo_rooms.values()):
-        furniture_string = p.server.cache.get(f'layout_furniture.{igloo.id}')
-        furniture_string = await get_layout_furniture(p, igloo.id) if furniture_string is None else furniture_string
-        like_count = p.server.cache.get(f'layout_like_count.{igloo.id}')
-        like_count = await get_layout_like_count(igloo.id) if like_count is None else like_count
-
-        p.server.cache.set(f'layout_furniture.{igloo.id}', furniture_string)
-        p.server.cache.set(f'layout_like_count.{igloo.id}', like_count)
+        furniture_string = await p.server.cache.get(f'layout_furniture.{igloo.id}')
+        if furniture_string is None:
+            furniture_string = await get_layout_furniture(p, igloo.id)
+            await p.server.cache.fill(f'layout_furniture.{igloo.id}', furniture_string)
+        like_count = await p.server.cache.get(f'layout_like_count.{igloo.id}')
+        if like_count is None:
+            like_count = await get_layout_like_count(igloo.id)
+            await p.server.cache.fill(f'layout_like_count.{igloo.id}', like_count)
         igloo_details = f'{igloo.id}:{slot}:0:{int(igloo.locked)}:{igloo.music}:{igloo.flooring}' \
                         f':{igloo.location}:{igloo.type}:{like_count}:{furniture_string}'
         layout_details.append(igloo_details)
@@ -134,35 +137,17 @@ async def igloos_load(server):
 @handlers.handler(XMLPacket('login'), priority=Priority.Low)
 @handlers.allow_once
 async def load_igloo_inventory(p):
-    p.igloos = await PenguinIglooCollection.get_collection(p.id)
-    p.igloo_rooms = await PenguinIglooRoomCollection.get_collection(p.id)
-    p.furniture = await PenguinFurnitureCollection.get_collection(p.id)
-    p.flooring = await PenguinFlooringCollection.get_collection(p.id)
-    p.locations = await PenguinLocationCollection.get_collection(p.id)
-
-    default_igloos = p.server.igloos.legacy_inventory if p.is_legacy_client else \
-        p.server.igloos.vanilla_inventory
-    for default_item in default_igloos:
-        if default_item.id not in p.igloos:
-            await p.igloos.insert(igloo_id=default_item.id)
-
-    default_locations = p.server.locations.legacy_inventory if p.is_legacy_client else \
-        p.server.locations.vanilla_inventory
-    for default_item in default_locations:
-        if default_item.id not in p.locations:
-            await p.locations.insert(location_id=default_item.id)
-
-    default_flooring = p.server.flooring.legacy_inventory if p.is_legacy_client else \
-        p.server.flooring.vanilla_inventory
-    for default_item in default_flooring:
-        if default_item.id not in p.flooring:
-            await p.flooring.insert(flooring_id=default_item.id)
-
-    default_furniture = p.server.furniture.legacy_inventory if p.is_legacy_client else \
-        p.server.furniture.vanilla_inventory
-    for default_item in default_furniture:
-        if default_item.id not in p.furniture:
-            await p.furniture.insert(furniture_id=default_item.id)
+    def get_missing_defaults(server_inventory, penguin_inventory, key):
+        default_items = server_inventory.legacy_inventory if p.is_legacy_client else \
+            server_inventory.vanilla_inventory
+        return [{key: default_item.id} for default_item in default_items if default_item.id not in penguin_inventory]
+
+    await asyncio.gather(
+        p.igloos.insert_many(get_missing_defaults(p.server.igloos, p.igloos, 'igloo_id')),
+        p.locations.insert_many(get_missing_defaults(p.server.locations, p.locations, 'location_id')),
+        p.flooring.insert_many(get_missing_defaults(p.server.flooring, p.flooring, 'flooring_id')),
+        p.furniture.insert_many(get_missing_defaults(p.server.furniture, p.furniture, 'furniture_id'))
+    )
 
 
 @handlers.handler(XTPacket('g', 'gm'))
@@ -171,18 +156,20 @@ async def handle_get_igloo_details(p, penguin_id: int):
     await create_first_igloo(p, penguin_id)
     cache_key = f'active_igloo.{penguin_id}' if p.is_vanilla_client else f'legacy_igloo.{penguin_id}'
     igloo_string_method = get_active_igloo_string if p.is_vanilla_client else get_legacy_igloo_string
-    igloo_string = p.server.cache.get(cache_key)
-    igloo_string = await igloo_string_method(p, penguin_id) if igloo_string is None else igloo_string
-    p.server.cache.set(cache_key, igloo_string)
+    igloo_string = await p.server.cache.get(cache_key)
+    if igloo_string is None:
+        igloo_string = await igloo_string_method(p, penguin_id)
+        await p.server.cache.fill(cache_key, igloo_string)
     await p.send_xt('gm', penguin_id, igloo_string)
 
 
 @handlers.handler(XTPacket('g', 'gail'), client=ClientType.Vanilla)
 async def handle_get_all_igloo_layouts(p):
     await p.status_field_set(StatusField.OpenedIglooViewer)
-    layouts_string = p.server.cache.get(f'igloo_layouts.{p.id}')
-    layouts_string = await get_all_igloo_layouts(p) if layouts_string is None else layouts_string
-    p.server.cache.set(f'igloo_layouts.{p.id}', layouts_string)
+    layouts_string = await p.server.cache.get(f'igloo_layouts.{p.id}')
+    if layouts_string is None:
+        layouts_string = await get_all_igloo_layouts(p)
+        await p.server.cache.fill(f'igloo_layouts.{p.id}', layouts_string)
     await p.send_xt('gail', p.id, 0, layouts_string)
 
 
@@ -191,9 +178,10 @@ async def handle_get_all_igloo_likes(p):
     total = 0
     like_strings = []
     for igloo in p.igloo_rooms.values():
-        like_count = p.server.cache.get(f'layout_like_count.{igloo.id}')
-        like_count = await get_layout_like_count(igloo.id) if like_count is None else like_count
-        p.server.cache.set(f'layout_like_count.{igloo.id}', like_count)
+        like_count = await p.server.cache.get(f'layout_like_count.{igloo.id}')
+        if like_count is None:
+            like_count = await get_layout_like_count(igloo.id)
+            await p.server.cache.fill(f'layout_like_count.{igloo.id}', like_count)
         total += like_count
         like_strings.append(f'{igloo.id}|{like_count}')
     await p.send_xt('gaili', total, ','.join(like_strings))
@@ -216,13 +204,13 @@ async def handle_buy_flooring(p, flooring: Flooring):
         igloo = p.igloo_rooms[p.igloo]
 
         await igloo.update(flooring=flooring.id).apply()
-        await p.update(coins=p.coins - flooring.cost).apply()
+        await p.apply_update(flush=True, coins=p.coins - flooring.cost)
 
         await p.send_xt('ag', flooring.id, p.coins)
 
-        p.server.cache.delete(f'active_igloo.{p.id}')
-        p.server.cache.delete(f'legacy_igloo.{p.id}')
-        p.server.cache.delete(f'igloo_layouts.{p.id}')
+        await p.server.cache.delete(f'active_igloo.{p.id}')
+        await p.server.cache.delete(f'legacy_igloo.{p.id}')
+        await p.server.cache.delete(f'igloo_layouts.{p.id}')
 
 
 @handlers.handler(XTPacket('g', 'aloc'), client=ClientType.Vanilla)
@@ -293,17 +281,18 @@ async def handle_update_igloo_configuration(p, igloo_id: int, igloo_type_id: int
                     music=music_id
                 ).apply()
 
-            like_count = p.server.cache.get(f'layout_like_count.{igloo.id}')
-            like_count = await get_layout_like_count(igloo.id) if like_count is None else like_count
-            p.server.cache.set(f'layout_like_count.{igloo.id}', like_count)
+            like_count = await p.server.cache.get(f'layout_like_count.{igloo.id}')
+            if like_count is None:
+                like_count = await get_layout_like_count(igloo.id)
+                await p.server.cache.fill(f'layout_like_count.{igloo.id}', like_count)
             active_igloo_string = f'{igloo.id}:1:0:{int(igloo.locked)}:{igloo.music}:{igloo.flooring}:' \
                                   f'{igloo.location}:{igloo.type}:{like_count}:{furniture_data}'
             await p.room.send_xt('uvi', p.id, active_igloo_string)
 
-            p.server.cache.set(f'layout_furniture.{igloo.id}', furniture_data)
-            p.server.cache.set(f'active_igloo.{p.id}', active_igloo_string)
-            p.server.cache.delete(f'legacy_igloo.{p.id}')
-            p.server.cache.delete(f'igloo_layouts.{p.id}')
+            await p.server.cache.set(f'layout_furniture.{igloo.id}', furniture_data)
+            await p.server.cache.set(f'active_igloo.{p.id}', active_igloo_string)
+            await p.server.cache.delete(f'legacy_igloo.{p.id}')
+            await p.server.cache.delete(f'igloo_layouts.{p.id}')
 
             if len(furniture_list) >= 99:
                 await p.add_stamp(p.server.stamps[23])
@@ -315,8 +304,8 @@ async def handle_save_igloo_furniture(p, *furniture_data):
     save_res = await save_igloo_furniture(p, furniture_data)
 
     if save_res:
-        p.server.cache.set(f'layout_furniture.{p.igloo}', ','.join(furniture_data))
-        p.server.cache.delete(f'legacy_igloo.{p.id}')
+        await p.server.cache.set(f'layout_furniture.{p.igloo}', ','.join(furniture_data))
+        await p.server.cache.delete(f'legacy_igloo.{p.id}')
 
 
 _slot_converter = SeparatorConverter(separator=',', mapper=str)
@@ -338,6 +327,7 @@ async def handle_update_igloo_slot_summary(p, igloo_id: int, slot_summary: _slot
             igloo.penguins_by_id = p.room.penguins_by_id
             igloo.penguins_by_username = p.room.penguins_by_username
             igloo.penguins_by_character_id = p.room.penguins_by_character_id
+            igloo.bus = p.room.bus
             p.room.penguins_by_id = {}
             p.room.penguins_by_username = {}
             p.room.penguins_by_character_id = {}
@@ -357,9 +347,9 @@ async def handle_update_igloo_slot_summary(p, igloo_id: int, slot_summary: _slot
                 if igloo.locked != bool(locked):
                     await igloo.update(locked=bool(locked)).apply()
 
-        p.server.cache.delete(f'active_igloo.{p.id}')
-        p.server.cache.delete(f'legacy_igloo.{p.id}')
-        p.server.cache.delete(f'igloo_layouts.{p.id}')
+        await p.server.cache.delete(f'active_igloo.{p.id}')
+        await p.server.cache.delete(f'legacy_igloo.{p.id}')
+        await p.server.cache.delete(f'igloo_layouts.{p.id}')
 
         active_igloo_string = await get_active_igloo_string(p, p.id)
         await p.room.send_xt('uvi', p.id, active_igloo_string)
@@ -400,9 +390,10 @@ async def handle_add_igloo_layout(p):
 @handlers.cooldown(1)
 async def handle_get_igloo_like_by(p, pagination_start: int, pagination_end: int):
     if p.room.igloo:
-        like_count = p.server.cache.get(f'layout_like_count.{p.room.id}')
-        like_count = await get_layout_like_count(p.room.id) if like_count is None else like_count
-        p.server.cache.set(f'layout_like_count.{p.room.id}', like_count)
+        like_count = await p.server.cache.get(f'layout_like_count.{p.room.id}')
+        if like_count is None:
+            like_count = await get_layout_like_count(p.room.id)
+            await p.server.cache.fill(f'layout_like_count.{p.room.id}', like_count)
 
         liked_by = IglooLike.query.where(IglooLike.igloo_id == p.room.id). \
             limit(pagination_end - pagination_start).offset(pagination_start).gino
@@ -452,19 +443,20 @@ async def handle_can_like_igloo(p):
 async def handle_get_open_igloo_list(p):
     async def get_igloo_string(igloo):
         owner_name = p.server.penguins_by_id[igloo.penguin_id].safe_name
-        like_count = p.server.cache.get(f'layout_like_count.{igloo.id}')
-        like_count = await get_layout_like_count(igloo.id) if like_count is None else like_count
-        p.server.cache.set(f'layout_like_count.{igloo.id}', like_count)
+        like_count = await p.server.cache.get(f'layout_like_count.{igloo.id}')
+        if like_count is None:
+            like_count = await get_layout_like_count(igloo.id)
+            await p.server.cache.fill(f'layout_like_count.{igloo.id}', like_count)
         igloo_population = len(igloo.penguins_by_id)
         return f'{igloo.penguin_id}|{owner_name}|{like_count}|{igloo_population}|{int(igloo.locked)}'
 
     open_igloos = [await get_igloo_string(igloo) for igloo in p.server.open_igloos_by_penguin_id.values()]
     local_room_population = 0
 
-    own_layout_like_count = p.server.cache.get(f'layout_like_count.{p.igloo}')
-    own_layout_like_count = 0 if p.igloo is None else await get_layout_like_count(p.igloo) \
-        if own_layout_like_count is None else own_layout_like_count
-    p.server.cache.set(f'layout_like_count.{p.igloo}', own_layout_like_count)
+    own_layout_like_count = 0 if p.igloo is None else await p.server.cache.get(f'layout_like_count.{p.igloo}')
+    if own_layout_like_count is None:
+        own_layout_like_count = await get_layout_like_count(p.igloo)
+        await p.server.cache.fill(f'layout_like_count.{p.igloo}', own_layout_like_count)
 
     own_layout_like_count = 0 if p.igloo is None else await get_layout_like_count(p.igloo)
     await p.send_xt('gr', own_layout_like_count, local_room_population, *open_igloos)
@@ -511,9 +503,9 @@ async def handle_update_igloo_music(p, music_id: int):
     if p.room.igloo and p.room.penguin_id == p.id and p.room.music != music_id:
         await p.room.update(music=music_id).apply()
 
-        p.server.cache.delete(f'active_igloo.{p.id}')
-        p.server.cache.delete(f'legacy_igloo.{p.id}')
-        p.server.cache.delete(f'igloo_layouts.{p.id}')
+        await p.server.cache.delete(f'active_igloo.{p.id}')
+        await p.server.cache.delete(f'legacy_igloo.{p.id}')
+        await p.server.cache.delete(f'igloo_layouts.{p.id}')
 
 
 @handlers.handler(XTPacket('g', 'ao'), client=ClientType.Legacy)
@@ -522,18 +514,18 @@ async def handle_activate_igloo_type(p, igloo_type_id: int):
             and igloo_type_id in p.igloos:
         await p.room.update(type=igloo_type_id, flooring=0).apply()
 
-        p.server.cache.delete(f'active_igloo.{p.id}')
-        p.server.cache.delete(f'legacy_igloo.{p.id}')
-        p.server.cache.delete(f'igloo_layouts.{p.id}')
+        await p.server.cache.delete(f'active_igloo.{p.id}')
+        await p.server.cache.delete(f'legacy_igloo.{p.id}')
+        await p.server.cache.delete(f'igloo_layouts.{p.id}')
 
 
 @handlers.handler(XTPacket('g', 'grf'), client=ClientType.Vanilla)
 async def handle_get_friends_igloo_list(p):
     async def get_friend_igloo_string(penguin):
-        like_count = p.server.cache.get(f'layout_like_count.{penguin.igloo}')
-        like_count = 0 if penguin.igloo is None else await get_layout_like_count(penguin.igloo) \
-            if like_count is None else like_count
-        p.server.cache.set(f'layout_like_count.{penguin.igloo}', like_count)
+        like_count = 0 if penguin.igloo is None else await p.server.cache.get(f'layout_like_count.{penguin.igloo}')
+        if like_count is None:
+            like_count = await get_layout_like_count(penguin.igloo)
+            await p.server.cache.fill(f'layout_like_count.{penguin.igloo}', like_count)
         return f'{penguin.id}|{like_count}'
 
     friend_igloos = [await get_friend_igloo_string(penguin) for penguin in p.server.penguins_by_id.values()
@@ -555,7 +547,7 @@ async def handle_like_igloo(p):
         like_count = await like_insert.gino.scalar()
 
         await p.room.send_xt('lue', p.id, like_count, f=lambda penguin: penguin.id != p.id)
-        p.server.cache.delete(f'layout_like_count.{p.room.id}')
+        await p.server.cache.delete(f'layout_like_count.{p.room.id}')
 
 
 @handlers.handler(XTPacket('g', 'gii'), client=ClientType.Vanilla)
@@ -1,13 +1,7 @@
 from houdini import handlers
-from houdini.data.buddy import IgnoreList, IgnoreListCollection
+from houdini.data.buddy import IgnoreList
 from houdini.data.penguin import Penguin
-from houdini.handlers import Priority, XMLPacket, XTPacket
-
-
-@handlers.handler(XMLPacket('login'), priority=Priority.Low)
-@handlers.allow_once
-async def load_ignore_inventory(p):
-    p.ignore = await IgnoreListCollection.get_collection(p.id)
+from houdini.handlers import XTPacket
 
 
 @handlers.handler(XTPacket('n', 'gn'))
@@ -3,8 +3,6 @@ import calendar
 
 from houdini import handlers
 from houdini.data.item import Item, ItemCollection, PenguinItemCollection
-from houdini.data.permission import PenguinPermissionCollection
-from houdini.data.plugin import PenguinAttributeCollection
 from houdini.handlers import Priority, XMLPacket, XTPacket
 
 
@@ -44,18 +42,13 @@ async def items_load(server):
 @handlers.handler(XMLPacket('login'), priority=Priority.Low)
 @handlers.allow_once
 async def load_inventory(p):
-    p.inventory = await PenguinItemCollection.get_collection(p.id)
-    p.permissions = await PenguinPermissionCollection.get_collection(p.id)
-    p.attributes = await PenguinAttributeCollection.get_collection(p.id)
-
-    if p.color is not None and p.color not in p.inventory:
-        await p.inventory.insert(item_id=p.color)
-
     default_items = p.server.items.legacy_inventory if p.is_legacy_client else \
         p.server.items.vanilla_inventory
-    for default_item in default_items:
-        if default_item.id not in p.inventory:
-            await p.inventory.insert(item_id=default_item.id)
+    missing_items = {default_item.id for default_item in default_items if default_item.id not in p.inventory}
+    if p.color is not None and p.color not in p.inventory:
+        missing_items.add(p.color)
+
+    await p.inventory.insert_many([dict(item_id=item_id) for item_id in missing_items])
 
 
 @handlers.handler(XTPacket('i', 'gi'))
@@ -86,9 +79,10 @@ async def handle_buy_inventory(p, item: Item):
 @handlers.depends_on_packet(XTPacket('i', 'gi'))
 @handlers.cooldown(1)
 async def handle_query_player_pins(p, player_id: int):
-    string = p.server.cache.get(f'pins.{player_id}')
-    string = await get_pin_string(p, player_id) if string is None else string
-    p.server.cache.set(f'pins.{player_id}', string)
+    string = await p.server.cache.get(f'pins.{player_id}')
+    if string is None:
+        string = await get_pin_string(p, player_id)
+        await p.server.cache.fill(f'pins.{player_id}', string)
     await p.send_xt('qpp', string)
 
 
@@ -96,7 +90,8 @@ async def handle_query_player_pins(p, player_id: int):
 @handlers.depends_on_packet(XTPacket('i', 'gi'))
 @handlers.cooldown(1)
 async def handle_query_player_awards(p, player_id: int):
-    string = p.server.cache.get(f'awards.{player_id}')
-    string = await get_awards_string(p, player_id) if string is None else string
-    p.server.cache.set(f'awards.{player_id}', string)
+    string = await p.server.cache.get(f'awards.{player_id}')
+    if string is None:
+        string = await get_awards_string(p, player_id)
+        await p.server.cache.fill(f'awards.{player_id}', string)
     await p.send_xt('qpa', player_id, string)
@@ -79,7 +79,7 @@ async def handle_send_mail(p, recipient_id: int, postcard_id: int):
         if mail_count >= 100:
             return await p.send_xt('ms', p.coins, 0)
         await PenguinPostcard.create(penguin_id=recipient_id, sender_id=p.id, postcard_id=postcard_id)
-    await p.update(coins=p.coins - 10).apply()
+    await p.apply_update(flush=True, coins=p.coins - 10)
     return await p.send_xt('ms', p.coins, 1)
 
 
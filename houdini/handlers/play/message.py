@@ -1,14 +1,41 @@
+import asyncio
+import signal
+
 from houdini import handlers
+from houdini.chatfilter import ChatFilter
 from houdini.commands import UnknownCommandException, has_command_prefix, invoke_command_string
 from houdini.data.moderator import ChatFilterRuleCollection
 from houdini.handlers import XTPacket
 from houdini.handlers.play.moderation import moderator_ban, moderator_kick
 
 
+_filter_reloads = set()
+
+
+async def reload_chat_filter(server):
+    """Recompiles the chat filter from the database and swaps it in once it's built"""
+    server.chat_filter = ChatFilter((await ChatFilterRuleCollection.get_collection()).values())
+    server.logger.info(f'Loaded {len(server.chat_filter)} filter words')
+
+
+def schedule_chat_filter_reload(server):
+    def reloaded(task):
+        _filter_reloads.discard(task)
+        exception = None if task.cancelled() else task.exception()
+        if exception is not None:
+            server.logger.error('Failed to reload the chat filter', exc_info=exception)
+
+    reload = asyncio.create_task(reload_chat_filter(server))
+    _filter_reloads.add(reload)
+    reload.add_done_callback(reloaded)
+
+
 @handlers.boot
 async def filter_load(server):
-    server.chat_filter_words = {w.lower(): c for w, c in (await ChatFilterRuleCollection.get_collection()).items()}
-    server.logger.info(f'Loaded {len(server.chat_filter_words)} filter words')
+    await reload_chat_filter(server)
+
+    if hasattr(signal, 'SIGHUP'):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, schedule_chat_filter_reload, server)
 
 
 @handlers.handler(XTPacket('m', 'sm'))
@@ -23,10 +50,8 @@ async def handle_send_message(p, penguin_id: int, message: str):
                 await penguin.send_xt("mm", message, penguin_id)
         return
 
-    if p.server.chat_filter_words:
-        tokens = message.lower().split()
-
-        consequence = next((c for w, c in p.server.chat_filter_words.items() if w in tokens), None)
+    if p.server.chat_filter:
+        consequence = p.server.chat_filter.match(message)
 
         if consequence is not None:
             if consequence.ban:
@@ -48,7 +73,7 @@ async def handle_send_message(p, penguin_id: int, message: str):
         else:
             await p.room.send_xt('sm', p.id, message)
 
-        p.logger.info(f'{p.username} said \'{message}\' in room \'{p.room.name}\'')
+        p.logger.info('%s said \'%s\' in room \'%s\'', p.username, message, p.room.name)
     except UnknownCommandException:
         await p.room.send_xt('sm', p.id, message)
-        p.logger.warn(f'{p.username} tried to use a command that does not exist \'{message}\'')
+        p.logger.warn('%s tried to use a command that does not exist \'%s\'', p.username, message)
@@ -64,6 +64,8 @@ async def setup_waddles(room_collection):
 @handlers.boot
 async def rooms_load(server):
     server.rooms = await RoomCollection.get_collection()
+    for room in server.rooms.values():
+        room.bus = server.bus
     await setup_tables(server.rooms)
     await setup_waddles(server.rooms)
     server.logger.info(f'Loaded {len(server.rooms)} rooms ({len(server.rooms.spawn_rooms)} spawn)')
@@ -120,8 +122,11 @@ async def handle_join_server(p, penguin_id: int, login_key: str):
     p.joined_world = True
 
     server_key = f'houdini.players.{p.server.config.id}'
-    await p.server.redis.sadd(server_key, p.id)
-    await p.server.redis.hset('houdini.population', p.server.config.id, len(p.server.penguins_by_id))
+    async with p.server.redis.pipeline(transaction=True) as tr:
+        tr.sadd(server_key, p.id)
+        tr.scard(server_key)
+        _, population = await tr.execute()
+    await p.server.redis.hset('houdini.population', p.server.config.id, population)
 
 
 async def room_cooling(p):
@@ -202,11 +207,17 @@ async def handle_disconnect_room(p):
                        ip_hash=hashed_ip,
                        minutes_played=minutes_played)
 
-    await p.update(minutes_played=p.minutes_played + minutes_played).apply()
+    await p.apply_update(flush=True, minutes_played=p.minutes_played + minutes_played)
 
     del p.server.penguins_by_id[p.id]
     del p.server.penguins_by_username[p.username]
 
-    server_key = f'houdini.players.{p.server.config.id}'
-    await p.server.redis.srem(server_key, p.id)
-    await p.server.redis.hset('houdini.population', p.server.config.id, len(p.server.penguins_by_id))
+    if p.server.bus is not None:
+        population = await p.server.bus.disconnect(p)
+    else:
+        server_key = f'houdini.players.{p.server.config.id}'
+        async with p.server.redis.pipeline(transaction=True) as tr:
+            tr.srem(server_key, p.id)
+            tr.scard(server_key)
+            _, population = await tr.execute()
+    await p.server.redis.hset('houdini.population', p.server.config.id, population)
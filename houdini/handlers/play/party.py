@@ -59,5 +59,5 @@ async def handle_party_task_complete(p, task_index: int):
 @handlers.cooldown(5)
 async def handle_party_task_update(p, coins: int):
     coins = min(coins, 10)
-    await p.update(coins=p.coins + coins).apply()
+    await p.apply_update(coins=p.coins + coins)
     await p.send_xt('qtupdate', p.coins)
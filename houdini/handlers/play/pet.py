@@ -1,4 +1,3 @@
-import asyncio
 import operator
 import random
 import time
@@ -6,13 +5,14 @@ from datetime import datetime, timedelta
 
 from houdini import handlers
 from houdini.constants import ClientType, StatusField
+from houdini.data import db
 from houdini.data.mail import PenguinPostcard
-from houdini.data.pet import PenguinPuffle, PenguinPuffleCollection, PenguinPuffleItemCollection, PuffleCollection, \
-    PuffleItemCollection, PuffleTreasureFurniture, PuffleTreasureItem, PuffleTreasurePuffleItem
+from houdini.data.pet import PenguinPuffle, PuffleCollection, PuffleItemCollection, PuffleTreasureFurniture, \
+    PuffleTreasureItem, PuffleTreasurePuffleItem
 from houdini.data.room import PenguinBackyardRoom, PenguinIglooRoom
-from houdini.handlers import Priority, XMLPacket, XTPacket
+from houdini.handlers import XTPacket
 
-PuffleKillerInterval = 1800
+PuffleDecayInterval = 1800
 LegacyPuffleIds = [0, 1, 2, 3, 4, 5, 6, 7, 8]
 
 BrushCareItemId = 1
@@ -21,40 +21,58 @@ SleepCareItemId = 37
 BasicCareInventory = [BrushCareItemId, BathCareItemId, SleepCareItemId]
 
 
-async def decrease_stats(server):
-    while True:
-        await asyncio.sleep(PuffleKillerInterval)
-        for penguin in server.penguins_by_id.values():
-            if type(penguin.room) != PenguinIglooRoom or penguin.room.penguin_id != penguin.id:
-                for puffle_id in list(penguin.puffles.keys()):
-                    puffle = penguin.puffles[puffle_id]
-                    puffle_crumbs = server.puffles[puffle.puffle_id]
-                    is_legacy_puffle = penguin.is_legacy_client and puffle.puffle_id in LegacyPuffleIds
-                    is_vanilla_puffle = penguin.is_vanilla_client and not puffle.backyard
-                    if is_vanilla_puffle or is_legacy_puffle:
-                        if puffle.id == penguin.walking:
-                            await puffle.update(
-                                food=max(10, puffle.food - 8),
-                                rest=max(10, puffle.rest - 8),
-                                clean=max(10, puffle.clean - 8)
-                            ).apply()
-                        else:
-                            await puffle.update(
-                                food=max(0, puffle.food - 4),
-                                play=max(0, puffle.play - 4),
-                                rest=max(0, puffle.rest - 4),
-                                clean=max(0, puffle.clean - 4)
-                            ).apply()
-                    if is_legacy_puffle and puffle.food == puffle.rest == puffle.clean == 0:
-                        await penguin.add_inbox(server.postcards[puffle_crumbs.runaway_postcard], details=puffle.name)
-                        await penguin.puffles.delete(puffle.id)
-                    elif is_legacy_puffle and puffle.food < 10:
-                        notification_aware = await PenguinPostcard.query.where(
-                            (PenguinPostcard.penguin_id == penguin.id)
-                            & (PenguinPostcard.postcard_id == 110)
-                            & (PenguinPostcard.details == puffle.name)).gino.scalar()
-                        if not notification_aware:
-                            await penguin.add_inbox(server.postcards[110], details=puffle.name)
+async def decrease_stats(penguin):
+    server = penguin.server
+    penguin.timers['puffle_decay'] = server.timers.call_later(PuffleDecayInterval, decrease_stats, penguin)
+
+    if type(penguin.room) == PenguinIglooRoom and penguin.room.penguin_id == penguin.id:
+        return
+
+    legacy_puffles, decaying_puffle_ids = [], []
+    for puffle in penguin.puffles.values():
+        is_legacy_puffle = penguin.is_legacy_client and puffle.puffle_id in LegacyPuffleIds
+        is_vanilla_puffle = penguin.is_vanilla_client and not puffle.backyard
+        if is_legacy_puffle:
+            legacy_puffles.append(puffle)
+        if is_vanilla_puffle or is_legacy_puffle:
+            decaying_puffle_ids.append(puffle.id)
+
+    if not decaying_puffle_ids:
+        return
+
+    walking = PenguinPuffle.id == penguin.walking
+
+    def decay(stat):
+        return db.case([(walking, db.func.greatest(10, stat - 8))], else_=db.func.greatest(0, stat - 4))
+
+    decay_query = PenguinPuffle.update.values(
+        food=decay(PenguinPuffle.food),
+        play=db.case([(walking, PenguinPuffle.play)], else_=db.func.greatest(0, PenguinPuffle.play - 4)),
+        rest=decay(PenguinPuffle.rest),
+        clean=decay(PenguinPuffle.clean)
+    ).where(PenguinPuffle.id.in_(decaying_puffle_ids)).returning(
+        PenguinPuffle.id, PenguinPuffle.food, PenguinPuffle.play, PenguinPuffle.rest, PenguinPuffle.clean)
+
+    for puffle_id, food, play, rest, clean in await decay_query.gino.all():
+        penguin.puffles[puffle_id].update(food=food, play=play, rest=rest, clean=clean)
+
+    runaway_puffles = [puffle for puffle in legacy_puffles if puffle.food == puffle.rest == puffle.clean == 0]
+    hungry_puffles = [puffle for puffle in legacy_puffles if puffle.food < 10 and puffle not in runaway_puffles]
+
+    postcards = [(server.postcards[server.puffles[puffle.puffle_id].runaway_postcard], puffle.name)
+                 for puffle in runaway_puffles]
+
+    if hungry_puffles:
+        aware_query = PenguinPostcard.select('details').where(
+            (PenguinPostcard.penguin_id == penguin.id)
+            & (PenguinPostcard.postcard_id == 110)
+            & (PenguinPostcard.details.in_([puffle.name for puffle in hungry_puffles])))
+        notification_aware = {details for details, in await aware_query.gino.all()}
+        postcards += [(server.postcards[110], puffle.name) for puffle in hungry_puffles
+                      if puffle.name not in notification_aware]
+
+    await penguin.add_inbox_many(postcards)
+    await penguin.puffles.delete_many([puffle.id for puffle in runaway_puffles])
 
 
 async def dig(p, on_command=False):
@@ -121,7 +139,7 @@ async def dig(p, on_command=False):
 
         if (on_command and treasure_type is None) or treasure_type == 'coins':
             treasure_quantity = random.randrange(10, 250)
-            await p.update(coins=p.coins + treasure_quantity).apply()
+            await p.apply_update(coins=p.coins + treasure_quantity)
             if treasure_quantity >= 50:
                 await p.add_stamp(p.server.stamps[493])
 
@@ -215,8 +233,7 @@ def get_my_player_walking_puffle(p):
 
 
 def check_name(p, puffle_name):
-    tokens = puffle_name.lower().split()
-    clean = not any(word in tokens for word in p.server.chat_filter_words.keys())
+    clean = p.server.chat_filter.match(puffle_name) is None
     length_ok = 1 <= len(puffle_name) <= 12
     characters_ok = puffle_name.isalpha()
     return characters_ok and length_ok and clean
@@ -233,15 +250,6 @@ async def puffles_load(server):
     server.puffle_furniture_treasure = await PuffleTreasureFurniture.query.gino.all()
     server.puffle_clothing_treasure = await PuffleTreasureItem.query.gino.all()
 
-    server.puffle_killer = asyncio.create_task(decrease_stats(server))
-
-
-@handlers.handler(XMLPacket('login'), priority=Priority.Low)
-@handlers.allow_once
-async def load_pet_inventory(p):
-    p.puffles = await PenguinPuffleCollection.get_collection(p.id)
-    p.puffle_items = await PenguinPuffleItemCollection.get_collection(p.id)
-
 
 @handlers.handler(XTPacket('p', 'getdigcooldown'), pre_login=True)
 async def handle_get_dig_cooldown(p):
@@ -326,7 +334,7 @@ async def handle_adopt_puffle_vanilla(p, type_id: int, name: str, subtype_id: in
         await p.add_puffle_item(p.server.puffle_items[79], cost=0)
         await p.add_puffle_item(p.server.puffle_items[p.server.puffles[puffle_id].favourite_toy])
 
-    await p.update(coins=p.coins - cost).apply()
+    await p.apply_update(flush=True, coins=p.coins - cost)
 
     puffle = await p.puffles.insert(puffle_id=puffle_id, name=name)
 
@@ -358,7 +366,7 @@ async def handle_adopt_puffle_legacy(p, type_id: int, name: str):
     if len(p.puffles) >= 18:
         return await p.send_error(440)
 
-    await p.update(coins=p.coins - cost).apply()
+    await p.apply_update(flush=True, coins=p.coins - cost)
 
     puffle = await p.puffles.insert(puffle_id=type_id, name=name)
 
@@ -393,6 +401,7 @@ async def handle_puffle_frame(p, puffle_id: int, frame_id: int):
 async def handle_puffle_walk_vanilla(p, puffle: PenguinPuffle, walking: int):
     if not p.walking and walking:
         await p.update(walking=puffle.id).apply()
+        p.invalidate_string()
         parent_id, puffle_id = get_client_puffle_id(p, puffle.puffle_id)
         await p.room.send_xt('pw', p.id, puffle.id, parent_id, puffle_id, 1, puffle.hat or 0)
     elif not walking and puffle.id == p.walking:
@@ -405,6 +414,7 @@ async def handle_puffle_walk_vanilla(p, puffle: PenguinPuffle, walking: int):
         await puffle.update(backyard=return_to_backyard).apply()
 
         await p.update(walking=None).apply()
+        p.invalidate_string()
         await p.room.send_xt('pw', p.id, puffle.id, 0, 0, 0, 0)
 
     puffle_string = f'{puffle.id}||||||||||||{walking}'
@@ -424,10 +434,12 @@ async def handle_puffle_walk_legacy(p, puffle: PenguinPuffle, walking: int):
             return
 
         await p.update(walking=puffle.id).apply()
+        p.invalidate_string()
         await p.room.send_xt('pw', p.id, puffle.id, -1, str(), 1, 0,
                              f=operator.attrgetter('is_vanilla_client'))
     elif puffle.id == p.walking and not walking:
         await p.update(walking=None).apply()
+        p.invalidate_string()
         await p.room.send_xt('pw', p.id, puffle.id, 0, 0, 0, 0,
                              f=operator.attrgetter('is_vanilla_client'))
 
@@ -441,9 +453,11 @@ async def handle_wear_puffle(p, item_id: int):
         walking_puffle = p.puffles[p.walking]
         if item_id == walking_puffle.puffle_id + 750:
             await p.update(hand=item_id).apply()
+            p.invalidate_string()
             await p.room.send_xt('upa', p.id, item_id)
         else:
             await p.update(walking=None).apply()
+            p.invalidate_string()
 
 
 @handlers.disconnected
@@ -453,6 +467,7 @@ async def handle_stop_walking(p):
     if p.joined_world:
         if p.walking:
             await p.update(hand=None, walking=None).apply()
+            p.invalidate_string()
 
 
 @handlers.handler(XTPacket('p', 'pp'), client=ClientType.Vanilla)
@@ -511,7 +526,7 @@ async def handle_puffle_treat_legacy(p, puffle: PenguinPuffle, treat_id: int):
     if p.coins > 5:
         positive_food = random.randrange(5, 15)
         await puffle.update(food=min(100, puffle.food + positive_food)).apply()
-        await p.update(coins=p.coins - 5).apply()
+        await p.apply_update(coins=p.coins - 5)
 
         puffle_string = f'{puffle.id}|puf|fle|{puffle.clean}|{puffle.food}|{puffle.rest}'
         await p.room.send_xt('pt', p.coins, puffle_string, treat_id, f=operator.attrgetter('is_legacy_client'))
@@ -522,7 +537,7 @@ async def handle_puffle_feed_legacy(p, puffle: PenguinPuffle):
     if p.coins > 10:
         positive_food = random.randrange(15, 40)
         await puffle.update(food=min(100, puffle.food + positive_food)).apply()
-        await p.update(coins=p.coins - 10).apply()
+        await p.apply_update(coins=p.coins - 10)
 
         puffle_string = f'{puffle.id}|puf|fle|{puffle.clean}|{puffle.food}|{puffle.rest}'
         await p.room.send_xt('pf', p.coins, puffle_string, f=operator.attrgetter('is_legacy_client'))
@@ -538,7 +553,7 @@ async def handle_puffle_bath_legacy(p, puffle: PenguinPuffle):
             clean=min(100, puffle.clean + additional_clean)
         ).apply()
 
-        await p.update(coins=p.coins - 5).apply()
+        await p.apply_update(coins=p.coins - 5)
 
         puffle_string = f'{puffle.id}|puf|fle|{puffle.clean}|{puffle.food}|{puffle.rest}'
         await p.room.send_xt('pb', p.coins, puffle_string, f=operator.attrgetter('is_legacy_client'))
@@ -577,7 +592,7 @@ async def handle_puffle_feed_interation_legacy(p, puffle: PenguinPuffle, x: int,
         food=min(100, puffle.food + positive_food)
     ).apply()
 
-    await p.update(coins=p.coins - 10).apply()
+    await p.apply_update(coins=p.coins - 10)
 
     puffle_string = f'{puffle.id}|puf|fle|{puffle.clean}|{puffle.food}|{puffle.rest}'
     await p.room.send_xt('if', p.coins, puffle_string, x, y, f=operator.attrgetter('is_legacy_client'))
@@ -672,6 +687,7 @@ async def handle_puffle_visitor_hat_update(p, puffle: PenguinPuffle, hat_id: int
         await puffle.update(hat=hat_id if hat_id > 0 else None).apply()
         await p.room.send_xt('puphi', puffle.id, hat_id)
         if puffle.id == p.walking:
+            p.invalidate_string()
             parent_id, puffle_id = get_client_puffle_id(p, puffle.puffle_id)
             await p.room.send_xt('pw', p.id, puffle.id, 0, 0, 0, 0)
             await p.room.send_xt('pw', p.id, puffle.id, parent_id, puffle_id, 1, puffle.hat or 0)
@@ -687,6 +703,7 @@ async def handle_walk_swap_puffles(p, puffle: PenguinPuffle):
 
         puffle = p.puffles[puffle.id]
         await p.update(walking=puffle.id).apply()
+        p.invalidate_string()
 
         parent_id, puffle_id = get_client_puffle_id(p, puffle.puffle_id)
         await p.room.send_xt('pufflewalkswap', p.id, puffle.id, parent_id, puffle_id, 1, puffle.hat or 0)
@@ -715,6 +732,7 @@ async def handle_change_puffle_room(p, puffle: PenguinPuffle, room_type: str):
 async def handle_return_puffle(p, puffle: PenguinPuffle):
     if p.walking == puffle.id:
         await p.update(walking=None).apply()
+        p.invalidate_string()
 
     await p.puffles.delete(puffle.id)
     await p.room.send_xt('prp', puffle.id)
@@ -1,4 +1,3 @@
-import asyncio
 import random
 import time
 from datetime import datetime, timedelta
@@ -10,6 +9,8 @@ from houdini.data import db
 from houdini.data.mail import PenguinPostcard
 from houdini.data.penguin import Penguin, PenguinMembership
 from houdini.handlers import Priority, XMLPacket, XTPacket
+from houdini.handlers.play.navigation import handle_join_server
+from houdini.handlers.play.pet import PuffleDecayInterval, decrease_stats
 
 
 async def get_player_string(p, penguin_id: int):
@@ -30,48 +31,60 @@ async def get_mascot_string(p, mascot_id: int):
         return string
 
 
-async def server_heartbeat(server):
-    while True:
-        timer = time.time()
-        await asyncio.sleep(61)
-        for penguin in server.penguins_by_id.values():
-            if penguin.heartbeat < timer:
-                await penguin.close()
-
-
-async def server_egg_timer(server):
-    while True:
-        await asyncio.sleep(60)
-        for p in server.penguins_by_id.values():
-            if p.timer_active:
-                p.egg_timer_minutes -= 1
-                if p.is_vanilla_client:
-                    minutes_until_timer_end = datetime.combine(datetime.today(), p.timer_end) - datetime.now()
-                    minutes_until_timer_end = minutes_until_timer_end.total_seconds() // 60
-
-                    if minutes_until_timer_end <= p.egg_timer_minutes + 1:
-                        if p.egg_timer_minutes == 7:
-                            await p.send_error(915, p.egg_timer_minutes, p.timer_start, p.timer_end)
-                        elif p.egg_timer_minutes == 5:
-                            await p.send_error(915, p.egg_timer_minutes, p.timer_start, p.timer_end)
-                    else:
-                        if p.egg_timer_minutes == 7:
-                            await p.send_error(914, p.egg_timer_minutes, p.timer_total)
-                        elif p.egg_timer_minutes == 5:
-                            await p.send_error(914, p.egg_timer_minutes, p.timer_total)
-
-                    await p.send_xt('uet', max(0, p.egg_timer_minutes))
-                    if p.egg_timer_minutes < 0:
-                        await p.send_error_and_disconnect(916, p.timer_start, p.timer_end)
-                else:
-                    if p.egg_timer_minutes < 0:
-                        await p.send_error_and_disconnect(910)
+HeartbeatTimeout = 120
+EggTimerInterval = 60
+
+
+async def heartbeat_check(p):
+    heartbeat_expiry = p.heartbeat + HeartbeatTimeout
+    if heartbeat_expiry <= time.time():
+        await p.close()
+    else:
+        p.timers['heartbeat'] = p.server.timers.call_later(heartbeat_expiry - time.time(), heartbeat_check, p)
+
+
+async def egg_timer_tick(p):
+    p.timers['egg_timer'] = p.server.timers.call_later(EggTimerInterval, egg_timer_tick, p)
+
+    p.egg_timer_minutes -= 1
+    if p.is_vanilla_client:
+        minutes_until_timer_end = datetime.combine(datetime.today(), p.timer_end) - datetime.now()
+        minutes_until_timer_end = minutes_until_timer_end.total_seconds() // 60
+
+        if minutes_until_timer_end <= p.egg_timer_minutes + 1:
+            if p.egg_timer_minutes == 7:
+                await p.send_error(915, p.egg_timer_minutes, p.timer_start, p.timer_end)
+            elif p.egg_timer_minutes == 5:
+                await p.send_error(915, p.egg_timer_minutes, p.timer_start, p.timer_end)
+        else:
+            if p.egg_timer_minutes == 7:
+                await p.send_error(914, p.egg_timer_minutes, p.timer_total)
+            elif p.egg_timer_minutes == 5:
+                await p.send_error(914, p.egg_timer_minutes, p.timer_total)
+
+        await p.send_xt('uet', max(0, p.egg_timer_minutes))
+        if p.egg_timer_minutes < 0:
+            await p.send_error_and_disconnect(916, p.timer_start, p.timer_end)
+    else:
+        if p.egg_timer_minutes < 0:
+            await p.send_error_and_disconnect(910)
+
+
+@handlers.handler(XTPacket('j', 'js'), after=handle_join_server)
+@handlers.allow_once
+async def handle_start_player_timers(p):
+    p.timers['heartbeat'] = p.server.timers.call_later(HeartbeatTimeout, heartbeat_check, p)
+    p.timers['puffle_decay'] = p.server.timers.call_later(PuffleDecayInterval, decrease_stats, p)
+    if p.timer_active:
+        p.timers['egg_timer'] = p.server.timers.call_later(EggTimerInterval, egg_timer_tick, p)
 
 
-@handlers.boot
-async def heartbeat_service_start(server):
-    server.heartbeat = asyncio.create_task(server_heartbeat(server))
-    server.egg_timer = asyncio.create_task(server_egg_timer(server))
+@handlers.disconnected
+@handlers.player_attribute(joined_world=True)
+async def handle_cancel_player_timers(p):
+    for timer in p.timers.values():
+        timer.cancel()
+    p.timers.clear()
 
 
 MemberWarningDaysToExpiry = 14
@@ -157,7 +170,7 @@ async def handle_heartbeat(p):
 @handlers.handler(XTPacket('u', 'gp'))
 @handlers.cooldown(1)
 async def handle_get_player(p, penguin_id: int):
-    player_string = p.server.cache.get(f'player.{penguin_id}')
+    player_string = await p.server.cache.get(f'player.{penguin_id}')
     player_string = await get_player_string(p, penguin_id) if player_string is None else player_string
     await p.send_xt('gp', player_string)
 
@@ -165,9 +178,10 @@ async def handle_get_player(p, penguin_id: int):
 @handlers.handler(XTPacket('u', 'gmo'), client=ClientType.Vanilla)
 @handlers.cooldown(1)
 async def handle_get_mascot(p, mascot_id: int):
-    mascot_string = p.server.cache.get(f'mascot.{mascot_id}')
-    mascot_string = await get_mascot_string(p, mascot_id) if mascot_string is None else mascot_string
-    p.server.cache.set(f'mascot.{mascot_id}', mascot_string)
+    mascot_string = await p.server.cache.get(f'mascot.{mascot_id}')
+    if mascot_string is None:
+        mascot_string = await get_mascot_string(p, mascot_id)
+        await p.server.cache.fill(f'mascot.{mascot_id}', mascot_string)
     await p.send_xt('gmo', mascot_string)
 
 
@@ -245,6 +259,8 @@ async def handle_find_player(p, player_id: int):
         room_id = player.room.id
         room_type = 'backyard' if player.room.backyard else 'igloo' if player.room.igloo else 'invalid'
         room_owner = player.room.penguin_id if player.room.igloo else -1
+    elif p.server.bus is not None and (location := await p.server.bus.locate(player_id)) is not None:
+        room_id, room_type, room_owner, _ = location
     else:
         room_id, room_type, room_owner = -1, 'invalid', -1
     await p.send_xt('bf', room_id, room_type, room_owner)
@@ -272,9 +288,10 @@ async def handle_pbsm_finish(p):
 
 @handlers.handler(XTPacket('u', 'sp'))
 async def handle_set_player_position(p, x: int, y: int):
-    p.x, p.y = x, y
+    p.room.move_penguin(p, x, y)
     p.frame = 1
     p.toy = None
+    p.invalidate_string()
     await p.room.send_xt('sp', p.id, x, y)
 
 
@@ -282,6 +299,7 @@ async def handle_set_player_position(p, x: int, y: int):
 @handlers.cooldown(.5)
 async def handle_set_player_frame(p, frame: int):
     p.frame = frame
+    p.invalidate_string()
     await p.room.send_xt('sf', p.id, frame)
 
 
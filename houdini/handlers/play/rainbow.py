@@ -89,7 +89,7 @@ async def handle_rainbow_puffle_task_coin_collected(p, task_id: int):
         await p.server.redis.sadd(f'houdini.rainbow_coins.{p.id}', task_id)
         await p.server.redis.expireat(f'houdini.rainbow_coins.{p.id}',
                                       (datetime.now() + timedelta(days=30)))
-        await p.update(coins=p.coins + 150).apply()
+        await p.apply_update(coins=p.coins + 150)
         await p.send_xt('rpqcc', task_id, 2, p.coins)
 
 
@@ -112,5 +112,5 @@ async def handle_rainbow_puffle_task_bonus_collected(p):
             coins_collected = await p.server.redis.sismember(f'houdini.rainbow_coins.{p.id}', 'bonus')
             if not coins_collected:
                 await p.server.redis.sadd(f'houdini.rainbow_coins.{p.id}', 'bonus')
-                await p.update(coins=p.coins + 500).apply()
+                await p.apply_update(coins=p.coins + 500)
                 await p.send_xt('rpqbc', 0, 0, p.coins)
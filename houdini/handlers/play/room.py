@@ -10,7 +10,7 @@ from houdini.handlers import XTPacket
 async def handle_get_coin_reward(p):
     if random.random() < 0.3:
         coins = random.choice([1, 2, 5, 10, 20, 50, 100])
-        await p.update(coins=Penguin.coins + coins).apply()
+        await p.apply_update(coins=p.coins + coins)
         await p.send_xt('cdu', coins, p.coins)
 		
 @handlers.handler(XTPacket('r', 'gtc'))
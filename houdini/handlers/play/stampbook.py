@@ -1,7 +1,7 @@
 from houdini import handlers
 from houdini.data.penguin import Penguin
 from houdini.data.stamp import CoverItem, CoverStamp, PenguinStampCollection, Stamp, StampCollection
-from houdini.handlers import Priority, XMLPacket, XTPacket
+from houdini.handlers import XTPacket
 from houdini.handlers.play.navigation import handle_join_room, handle_join_server
 
 
@@ -41,12 +41,6 @@ async def stamps_load(server):
     server.logger.info(f'Loaded {len(server.stamps)} stamps')
 
 
-@handlers.handler(XMLPacket('login'), priority=Priority.Low)
-@handlers.allow_once
-async def load_stamp_inventory(p):
-    p.stamps = await PenguinStampCollection.get_collection(p.id)
-
-
 @handlers.handler(XTPacket('j', 'js'), after=handle_join_server)
 @handlers.allow_once
 async def handle_get_stamps(p):
@@ -71,9 +65,10 @@ async def handle_add_mascot_stamp(p):
 @handlers.handler(XTPacket('st', 'gps'))
 @handlers.cooldown(1)
 async def handle_get_player_stamps(p, player_id: int):
-    stamps_string = p.server.cache.get(f'stamps.{player_id}')
-    stamps_string = await get_player_stamps_string(p, player_id) if stamps_string is None else stamps_string
-    p.server.cache.set(f'stamps.{player_id}', stamps_string)
+    stamps_string = await p.server.cache.get(f'stamps.{player_id}')
+    if stamps_string is None:
+        stamps_string = await get_player_stamps_string(p, player_id)
+        await p.server.cache.fill(f'stamps.{player_id}', stamps_string)
     await p.send_xt('gps', player_id, stamps_string)
 
 
@@ -96,9 +91,10 @@ async def handle_stamp_add(p, stamp: Stamp):
 @handlers.handler(XTPacket('st', 'gsbcd'))
 @handlers.cooldown()
 async def handle_get_book_cover(p, player_id: int):
-    book_string = p.server.cache.get(f'book.{player_id}')
-    book_string = await get_book_cover_string(p, player_id) if book_string is None else book_string
-    p.server.cache.set(f'book.{player_id}', book_string)
+    book_string = await p.server.cache.get(f'book.{player_id}')
+    if book_string is None:
+        book_string = await get_book_cover_string(p, player_id)
+        await p.server.cache.fill(f'book.{player_id}', book_string)
     await p.send_xt('gsbcd', book_string)
 
 
@@ -154,4 +150,4 @@ async def handle_update_book_cover(p, color: int, highlight: int, pattern: int,
                    book_modified=1).apply()
 
     stringified_cover = '%'.join(cover)
-    p.server.cache.set(f'book.{p.id}', f'{color}%{highlight}%{pattern}%{icon}%{stringified_cover}')
+    await p.server.cache.set(f'book.{p.id}', f'{color}%{highlight}%{pattern}%{icon}%{stringified_cover}')
@@ -8,7 +8,7 @@ async def handle_donate_to_charity(p, charity: int, coins: int):
     if coins <= 0:
         return await cheat_ban(p, p.id, comment="Negative charity donation")
     if p.coins >= coins and 0 <= charity <= 4:
-        await p.update(coins=p.coins-coins).apply()
+        await p.apply_update(coins=p.coins-coins)
         await CfcDonation.create(penguin_id=p.id, coins=coins, charity=charity)
         await p.send_xt('dc', p.coins)
 
@@ -63,7 +63,7 @@ async def handle_send_book_answer(p, book: int, question_id: int, answer: str):
             item = 15007
             await p.add_inventory(p.server.items[item], notify=False)
 
-        await p.update(coins=p.coins + 1500).apply()
+        await p.apply_update(flush=True, coins=p.coins + 1500)
 
         await p.send_xt('rsba', item or '', 1500)
         await PenguinRedemptionBook.create(penguin_id=p.id, book_id=book)
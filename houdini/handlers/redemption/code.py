@@ -169,7 +169,7 @@ async def handle_code_legacy(p, redemption_code: str):
         return await p.send_error(726)
 
     if code.type == 'GOLDEN':
-        p.server.cache.set(f'{p.id}.{code.code}.golden_code', code)
+        await p.server.cache.set(f'{p.id}.{code.code}.golden_code', code)
         return await p.send_xt('rsc', 'GOLDEN', p.ninja_rank, p.fire_ninja_rank, p.water_ninja_rank,
                                int(p.fire_ninja_rank > 0), int(p.water_ninja_rank > 0))
 
@@ -184,7 +184,7 @@ async def handle_code_legacy(p, redemption_code: str):
                 await p.add_inventory(p.server.items[award.item_id], notify=False, cost=0)
 
     await PenguinRedemptionCode.create(penguin_id=p.id, code_id=code.id)
-    await p.update(coins=p.coins + code.coins).apply()
+    await p.apply_update(flush=True, coins=p.coins + code.coins)
     return await p.send_xt('rsc', code.type, ','.join(map(str, awards)), code.coins)
 
 
@@ -290,11 +290,11 @@ async def handle_code_vanilla(p, redemption_code: str):
                 awards.append(f'pi{award.puffle_item_id},{int(item_allowed)}')
 
         p.allowed_redemption_items = TreasureUnlockCount + bad_items + (2 if num_redeemed_codes == 4 else 0)
-        p.server.cache.set(f'{p.id}.{code.code}.treasure_code', code)
+        await p.server.cache.set(f'{p.id}.{code.code}.treasure_code', code)
         return await p.send_xt('rsc', 'treasurebook', p.allowed_redemption_items, owned_ids, num_redeemed_codes, 0, int(len(awards) > 0), '|'.join(awards))
 
     if code.type == 'GOLDEN':
-        p.server.cache.set(f'{p.id}.{code.code}.golden_code', code)
+        await p.server.cache.set(f'{p.id}.{code.code}.golden_code', code)
         return await p.send_xt('rsc', 'GOLDEN', p.ninja_rank, p.fire_ninja_rank, p.water_ninja_rank, p.snow_ninja_rank,
                                1, 1, 1)
 
@@ -362,7 +362,7 @@ async def handle_code_vanilla(p, redemption_code: str):
                 await p.add_puffle_item(p.server.puffle_items[award.puffle_item_id], notify=False, cost=0)
 
     await PenguinRedemptionCode.create(penguin_id=p.id, code_id=code.id)
-    await p.update(coins=p.coins + code.coins).apply()
+    await p.apply_update(flush=True, coins=p.coins + code.coins)
     return await p.send_xt('rsc', code.type, ','.join(map(str, awards)), code.coins or '')
 
 
@@ -370,8 +370,8 @@ async def handle_code_vanilla(p, redemption_code: str):
 @handlers.depends_on_packet(XTPacket('rsc', ext='red'))
 async def handle_golden_choice(p, redemption_code: str, choice: int):
     code_key = f'{p.id}.{redemption_code.upper()}.golden_code'
-    code = p.server.cache.get(code_key)
-    p.server.cache.delete(code_key)
+    code = await p.server.cache.get(code_key)
+    await p.server.cache.delete(code_key)
     if not code:
         return await p.close()
 
@@ -412,8 +412,8 @@ async def handle_golden_choice(p, redemption_code: str, choice: int):
 @handlers.depends_on_packet(XTPacket('rsc', ext='red'))
 async def handle_send_cart(p, redemption_code: str, choice: str):
     code_key = f'{p.id}.{redemption_code.upper()}.treasure_code'
-    code = p.server.cache.get(code_key)
-    p.server.cache.delete(code_key)
+    code = await p.server.cache.get(code_key)
+    await p.server.cache.delete(code_key)
 
     if code is None:
         return await p.close()
@@ -438,7 +438,7 @@ async def handle_send_cart(p, redemption_code: str, choice: str):
 
     await PenguinRedemptionCode.create(penguin_id=p.id, code_id=code.id)
 
-    await p.update(coins=p.coins + coins).apply()
+    await p.apply_update(flush=True, coins=p.coins + coins)
     await p.send_xt('rscrt', ','.join(awards), coins or '')
 
 
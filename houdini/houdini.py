@@ -1,17 +1,22 @@
 import asyncio
-import logging
-import os
-import sys
-from logging.handlers import RotatingFileHandler
+import signal
 
 from redis import asyncio as aioredis
-from cacheout import Cache
 
 from houdini import PenguinStringCompiler
-from houdini.data import db
+from houdini.bus import WorldBus
+from houdini.cache import TieredCache
+from houdini.crypto import PasswordVerifier
+from houdini.data import AbstractDataCollection, db
 from houdini.data.permission import PermissionCollection
+from houdini.log import setup_logging
+from houdini.metrics import MetricsServer
 from houdini.penguin import Penguin
+from houdini.profiler import SamplingProfiler
 from houdini.spheniscidae import Spheniscidae
+from houdini.timers import TimerWheel
+from houdini.watchdog import Watchdog
+from houdini.writebehind import WriteBehindBuffer
 
 try:
     import uvloop
@@ -32,12 +37,20 @@ class Houdini:
     def __init__(self, config):
         self.server = None
         self.redis = None
+        self.bus = None
+        self.write_behind = None
+        self.password_verifier = None
+        self.metrics = None
+        self.timers = TimerWheel(self)
+        self.watchdog = Watchdog(self)
+        self.profiler = SamplingProfiler(self)
         self.cache = None
         self.config = config
         self.db = db
         self.peers_by_ip = {}
 
         self.logger = None
+        self.log_listener = None
 
         self.client_class = Spheniscidae
         self.penguin_string_compiler = None
@@ -57,7 +70,7 @@ class Houdini:
         self.plugins = PluginManager(self)
 
         self.permissions = None
-        self.chat_filter_words = None
+        self.chat_filter = None
 
         self.items = None
         self.igloos = None
@@ -76,10 +89,6 @@ class Houdini:
         self.characters = None
         self.dance_songs = None
 
-        self.heartbeat = None
-        self.egg_timer = None
-        self.puffle_killer = None
-
         self.music = None
         self.dance_floor = None
         self.match_making = None
@@ -88,59 +97,54 @@ class Houdini:
 
         self.puck = (0, 0)
 
-    async def start(self):
-        general_log_file = self.config.logging_general_path if self.config.logging_general_path \
-            else f'logs/{self.config.name.lower()}.log'
-        errors_log_file = self.config.logging_error_path if self.config.logging_error_path \
-            else f'logs/{self.config.name.lower()}-errors.log'
-        general_log_directory = os.path.dirname(general_log_file)
-        errors_log_directory = os.path.dirname(errors_log_file)
-
-        if not os.path.exists(general_log_directory):
-            os.mkdir(general_log_directory)
-
-        if not os.path.exists(errors_log_directory):
-            os.mkdir(errors_log_directory)
+    async def reset_world(self):
+        redis = self.redis if self.redis is not None else \
+            aioredis.Redis.from_url(f'redis://{self.config.redis_address}:{self.config.redis_port}')
 
-        self.logger = logging.getLogger('houdini')
-        universal_handler = RotatingFileHandler(general_log_file,
-                                                maxBytes=2097152, backupCount=3, encoding='utf-8')
+        try:
+            await redis.delete(f'houdini.players.{self.config.id}', f'houdini.locations.{self.config.id}')
+            await redis.hset(f'houdini.population', self.config.id, 0)
+        finally:
+            if redis is not self.redis:
+                await redis.aclose()
 
-        error_handler = logging.FileHandler(errors_log_file)
-        console_handler = logging.StreamHandler(stream=sys.stdout)
-
-        log_formatter = logging.Formatter('%(asctime)s [%(levelname)-5.5s]  %(message)s')
-        error_handler.setLevel(logging.ERROR)
-
-        universal_handler.setFormatter(log_formatter)
-        console_handler.setFormatter(log_formatter)
+    async def start(self):
+        log_name = self.config.name.lower() if self.config.worker_id is None \
+            else f'{self.config.name.lower()}-{self.config.worker_id}'
+        self.logger, self.log_listener = setup_logging(self.config, log_name)
 
-        self.logger.addHandler(universal_handler)
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(error_handler)
+        self.timers.start()
+        self.watchdog.start()
 
-        level = logging.getLevelName(self.config.logging_level)
-        self.logger.setLevel(level)
+        if hasattr(signal, 'SIGUSR2'):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR2, self.profiler.toggle)
 
         self.server = await asyncio.start_server(
             self.client_connected, self.config.address,
-            self.config.port
+            self.config.port, reuse_port=self.config.worker_id is not None
         )
 
         await self.db.set_bind('postgresql://{}:{}@{}/{}'.format(
             self.config.database_username, self.config.database_password,
             self.config.database_address,
-            self.config.database_name))
+            self.config.database_name), min_size=self.config.database_pool_size,
+            max_size=self.config.database_pool_size)
+        AbstractDataCollection.limit_fetches(self.config.database_pool_size)
 
         self.logger.info('Booting Houdini')
         pool = aioredis.ConnectionPool.from_url(f'redis://{self.config.redis_address}:{self.config.redis_port}')
         self.redis = aioredis.Redis(connection_pool=pool)
 
         if self.config.type == 'world':
-            await self.redis.delete(f'houdini.players.{self.config.id}')
-            await self.redis.hset(f'houdini.population', self.config.id, 0)
+            if self.config.worker_id is None:
+                await self.reset_world()
+            else:
+                self.bus = WorldBus(self)
 
-            self.cache = Cache(maxsize=None, ttl=self.config.cache_expiry)
+            self.cache = TieredCache(self)
+
+            if self.config.write_behind_interval > 0:
+                self.write_behind = WriteBehindBuffer(self)
 
             self.client_class = Penguin
             self.penguin_string_compiler = PenguinStringCompiler()
@@ -153,12 +157,31 @@ class Houdini:
             await self.xt_listeners.setup(houdini.handlers)
             self.logger.info('World server started')
         else:
+            self.password_verifier = PasswordVerifier(self.config.password_pool, self.config.password_workers,
+                                                      self.config.password_queue_size)
+
             await self.xml_listeners.setup(houdini.handlers, 'houdini.handlers.login.login')
             self.logger.info('Login server started')
 
         await self.dummy_event_listeners.setup(houdini.handlers)
         await self.dummy_event_listeners.fire('boot', self)
 
+        if self.bus is not None:
+            await self.bus.start()
+            self.logger.info(f'Worker {self.config.worker_id} joined the world bus')
+
+        if self.cache is not None:
+            await self.cache.start()
+
+        if self.write_behind is not None:
+            self.write_behind.start()
+            self.logger.info(f'Writing penguin updates behind every {self.config.write_behind_interval}s')
+
+        if self.config.metrics_port:
+            self.metrics = MetricsServer(self)
+            await self.metrics.start()
+            self.logger.info(f'Serving metrics on {self.config.metrics_address}:{self.metrics.port}')
+
         self.permissions = await PermissionCollection.get_collection()
 
         self.logger.info(f'Multi-client support is '
@@ -171,8 +194,24 @@ class Houdini:
 
         await self.plugins.setup(houdini.plugins)
 
-        async with self.server:
-            await self.server.serve_forever()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if self.bus is not None:
+                await self.bus.close()
+            if self.cache is not None:
+                await self.cache.close()
+            if self.write_behind is not None:
+                await self.write_behind.close()
+            if self.password_verifier is not None:
+                self.password_verifier.shutdown()
+            if self.metrics is not None:
+                self.metrics.close()
+            self.timers.close()
+            self.watchdog.close()
+            await self.profiler.stop()
+            self.log_listener.stop()
 
     async def client_connected(self, reader, writer):
         client_object = self.client_class(self, reader, writer)
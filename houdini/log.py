@@ -0,0 +1,94 @@
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+import ujson
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line"""
+
+    def format(self, record):
+        return ujson.dumps({
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'module': record.module,
+            'message': record.getMessage()
+        })
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING logged from each module, given as module=rate pairs.
+    Warnings and errors are always kept.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.module)
+        return rate is None or random.random() < rate
+
+
+def parse_sample_rates(rates):
+    sample_rates = {}
+    for entry in rates:
+        module, _, rate = entry.partition('=')
+        sample_rates[module] = float(rate)
+    return sample_rates
+
+
+def setup_logging(config, log_name):
+    """
+    Attaches a queue handler to the houdini logger and starts a listener thread which writes
+    the queued records to the log files and stdout, so disk writes never block the event loop.
+    Returns the logger and the listener, which should be stopped on shutdown to flush the queue.
+    """
+    general_log_file = config.logging_general_path if config.logging_general_path \
+        else f'logs/{log_name}.log'
+    errors_log_file = config.logging_error_path if config.logging_error_path \
+        else f'logs/{log_name}-errors.log'
+    general_log_directory = os.path.dirname(general_log_file)
+    errors_log_directory = os.path.dirname(errors_log_file)
+
+    if not os.path.exists(general_log_directory):
+        os.mkdir(general_log_directory)
+
+    if not os.path.exists(errors_log_directory):
+        os.mkdir(errors_log_directory)
+
+    universal_handler = RotatingFileHandler(general_log_file,
+                                            maxBytes=2097152, backupCount=3, encoding='utf-8')
+
+    error_handler = logging.FileHandler(errors_log_file)
+    console_handler = logging.StreamHandler(stream=sys.stdout)
+
+    log_formatter = JsonFormatter() if config.logging_format == 'json' \
+        else logging.Formatter('%(asctime)s [%(levelname)-5.5s]  %(message)s')
+    error_handler.setLevel(logging.ERROR)
+
+    universal_handler.setFormatter(log_formatter)
+    console_handler.setFormatter(log_formatter)
+    error_handler.setFormatter(log_formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    if config.logging_sample:
+        queue_handler.addFilter(SamplingFilter(config.logging_sample))
+
+    listener = QueueListener(log_queue, universal_handler, console_handler, error_handler,
+                             respect_handler_level=True)
+
+    logger = logging.getLogger('houdini')
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.getLevelName(config.logging_level))
+
+    listener.start()
+    return logger, listener
@@ -0,0 +1,142 @@
+import asyncio
+import bisect
+
+LatencyBuckets = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0)
+
+
+class HandlerMetrics:
+    """Call latency histogram and failure counters of one listener or command"""
+
+    __slots__ = ['buckets', 'sum', 'count', 'checklist_failures', 'exceptions']
+
+    def __init__(self):
+        self.buckets = [0] * (len(LatencyBuckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+        self.checklist_failures = 0
+        self.exceptions = 0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LatencyBuckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + '}'
+
+
+class MetricsServer:
+    """
+    Serves handler, connection, room and event loop metrics in the Prometheus text format
+    on a local port, so handler latency can be scraped and alerted on.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.port = server.config.metrics_port if server.config.worker_id is None \
+            else server.config.metrics_port + server.config.worker_id
+
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_request, self.server.config.metrics_address,
+                                                  self.port)
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _handle_request(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), 5)
+            while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+                pass
+
+            path = request_line.split()[1] if len(request_line.split()) > 1 else b''
+            if path == b'/metrics':
+                status, body = '200 OK', self.render().encode('utf-8')
+            else:
+                status, body = '404 Not Found', b''
+
+            writer.write(f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n'
+                         f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('utf-8') + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def get_listeners(self):
+        for kind, manager in (('xt', self.server.xt_listeners), ('xml', self.server.xml_listeners)):
+            for packet, listeners in manager.items():
+                for listener in listeners:
+                    yield kind, packet.id, listener
+
+        seen = set()
+        commands = [self.server.commands]
+        while commands:
+            for command_objects in commands.pop().values():
+                for command_object in command_objects:
+                    if id(command_object) not in seen:
+                        seen.add(id(command_object))
+                        yield 'command', command_object.name, command_object
+                        if hasattr(command_object, 'commands'):
+                            commands.append(command_object.commands)
+
+    def render(self):
+        lines = ['# TYPE houdini_handler_latency_seconds histogram']
+        counters = {'cooldown_rejections': [], 'checklist_failures': [], 'exceptions': []}
+
+        for kind, packet_id, listener in self.get_listeners():
+            labels = {'kind': kind, 'packet': packet_id, 'handler': listener.__name__()}
+            metrics = listener.metrics
+
+            cumulative = 0
+            for bound, count in zip(LatencyBuckets + ('+Inf',), metrics.buckets):
+                cumulative += count
+                lines.append(f'houdini_handler_latency_seconds_bucket{format_labels({**labels, "le": bound})} '
+                             f'{cumulative}')
+            lines.append(f'houdini_handler_latency_seconds_sum{format_labels(labels)} {metrics.sum}')
+            lines.append(f'houdini_handler_latency_seconds_count{format_labels(labels)} {metrics.count}')
+
+            throttled = listener.cooldown.throttled if listener.cooldown is not None else 0
+            counters['cooldown_rejections'].append(f'{format_labels(labels)} {throttled}')
+            counters['checklist_failures'].append(f'{format_labels(labels)} {metrics.checklist_failures}')
+            counters['exceptions'].append(f'{format_labels(labels)} {metrics.exceptions}')
+
+        for name, samples in counters.items():
+            lines.append(f'# TYPE houdini_handler_{name}_total counter')
+            lines += [f'houdini_handler_{name}_total{sample}' for sample in samples]
+
+        lines += [
+            '# TYPE houdini_connections gauge',
+            f'houdini_connections {len(self.server.peers_by_ip)}',
+            '# TYPE houdini_penguins gauge',
+            f'houdini_penguins {len(self.server.penguins_by_id)}',
+            '# TYPE houdini_event_loop_lag_seconds gauge',
+            f'houdini_event_loop_lag_seconds {self.server.watchdog.loop_lag}',
+            '# TYPE houdini_event_loop_max_lag_seconds gauge',
+            f'houdini_event_loop_max_lag_seconds {self.server.watchdog.max_loop_lag}'
+        ]
+
+        if self.server.rooms is not None:
+            lines.append('# TYPE houdini_room_population gauge')
+            lines += [f'houdini_room_population{format_labels({"room": room.id, "name": room.name})} '
+                      f'{len(room.penguins_by_id)}' for room in self.server.rooms.values()]
+
+        if self.server.cache is not None:
+            for name, value in self.server.cache.get_stats().items():
+                lines.append(f'houdini_cache_{name} {value}')
+
+        if self.server.password_verifier is not None:
+            for name, value in self.server.password_verifier.get_stats().items():
+                lines.append(f'houdini_password_verifier_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -1,4 +1,5 @@
 import time
+import uuid
 
 from houdini.data import penguin
 from houdini.data.mail import PenguinPostcard
@@ -18,6 +19,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         'muted',
 
         'login_key',
+        'session_id',
 
         'is_member',
         'membership_days_total',
@@ -28,6 +30,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         'legacy_buddy_requests',
 
         'heartbeat',
+        'timers',
         'login_timestamp',
         'egg_timer_minutes'
     )
@@ -44,6 +47,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         self.muted = False
 
         self.login_key = None
+        self.session_id = uuid.uuid4().hex
 
         self.is_member = False
         self.membership_days_total = 0
@@ -54,6 +58,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         self.legacy_buddy_requests = set()
 
         self.heartbeat = time.time()
+        self.timers = {}
 
         self.login_timestamp = None
         self.egg_timer_minutes = None
@@ -76,6 +81,10 @@ class Penguin(Spheniscidae, penguin.Penguin):
     def string(self):
         return self.server.penguin_string_compiler.compile(self)
 
+    def invalidate_string(self):
+        if self.room is not None:
+            self.room.invalidate_string(self)
+
     @property
     def safe_name(self):
         return self.safe_nickname(self.server.config.lang)
@@ -84,10 +93,29 @@ class Penguin(Spheniscidae, penguin.Penguin):
     def member(self):
         return int(self.is_member)
 
+    async def apply_update(self, flush=False, **values):
+        """
+        Updates penguin columns, deferring the database write when write-behind is enabled.
+        A flushed update returns whether the write reached the database.
+        """
+        if self.server.write_behind is None:
+            await self.update(**values).apply()
+            return True
+
+        self.update(**values)
+        self.server.write_behind.mark(self, values)
+        if flush:
+            return await self.server.write_behind.flush(self)
+        return True
+
+    async def status_field_set(self, field_bitmask):
+        if (self.status_field & field_bitmask) == 0:
+            await self.apply_update(status_field=self.status_field ^ field_bitmask)
+
     async def join_room(self, room):
         await room.add_penguin(self)
 
-        self.logger.info(f'{self.username} joined room \'{room.name}\'')
+        self.logger.info('%s joined room \'%s\'', self.username, room.name)
 
     async def add_inventory(self, item, notify=True, cost=None):
         if item.id in self.inventory:
@@ -96,15 +124,15 @@ class Penguin(Spheniscidae, penguin.Penguin):
         cost = cost if cost is not None else item.cost
 
         await self.inventory.insert(item_id=item.id)
-        await self.update(coins=self.coins - cost).apply()
+        await self.apply_update(flush=True, coins=self.coins - cost)
 
         if notify:
             await self.send_xt('ai', item.id, self.coins)
 
-        self.logger.info(f'{self.username} added \'{item.name}\' to their clothing inventory')
+        self.logger.info('%s added \'%s\' to their clothing inventory', self.username, item.name)
 
-        self.server.cache.delete(f'pins.{self.id}')
-        self.server.cache.delete(f'awards.{self.id}')
+        await self.server.cache.delete(f'pins.{self.id}')
+        await self.server.cache.delete(f'awards.{self.id}')
 
         return True
 
@@ -118,7 +146,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         cost = cost if cost is not None else item.cost
 
         await self.inventory.insert(item_id=item.id)
-        await self.update(agent_medals=self.agent_medals - cost).apply()
+        await self.apply_update(flush=True, agent_medals=self.agent_medals - cost)
 
         if notify:
             await self.send_xt('epfai', self.agent_medals)
@@ -132,12 +160,12 @@ class Penguin(Spheniscidae, penguin.Penguin):
         cost = cost if cost is not None else igloo.cost
 
         await self.igloos.insert(igloo_id=igloo.id)
-        await self.update(coins=self.coins - cost).apply()
+        await self.apply_update(flush=True, coins=self.coins - cost)
 
         if notify:
             await self.send_xt('au', igloo.id, self.coins)
 
-        self.logger.info(f'{self.username} added \'{igloo.name}\' to their igloos inventory')
+        self.logger.info('%s added \'%s\' to their igloos inventory', self.username, igloo.name)
 
         return True
 
@@ -163,12 +191,12 @@ class Penguin(Spheniscidae, penguin.Penguin):
                                                                quantity=quantity)
 
         cost = cost if cost is not None else care_item.cost
-        await self.update(coins=self.coins - cost).apply()
+        await self.apply_update(flush=True, coins=self.coins - cost)
 
         if notify:
             await self.send_xt('papi', self.coins, care_item_id, penguin_care_item.quantity)
 
-        self.logger.info(f'{self.username} added \'{care_item.name}\' to their puffle care inventory')
+        self.logger.info('%s added \'%s\' to their puffle care inventory', self.username, care_item.name)
 
         return True
 
@@ -184,12 +212,12 @@ class Penguin(Spheniscidae, penguin.Penguin):
             await self.furniture.insert(furniture_id=furniture.id)
 
         cost = cost if cost is not None else furniture.cost
-        await self.update(coins=self.coins - cost).apply()
+        await self.apply_update(flush=True, coins=self.coins - cost)
 
         if notify:
             await self.send_xt('af', furniture.id, self.coins)
 
-        self.logger.info(f'{self.username} added \'{furniture.name}\' to their furniture inventory')
+        self.logger.info('%s added \'%s\' to their furniture inventory', self.username, furniture.name)
 
         return True
 
@@ -204,7 +232,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         else:
             await self.cards.insert(card_id=card.id, quantity=quantity, member_quantity=member_quantity)
 
-        self.logger.info(f'{self.username} added \'{card.name}\' to their ninja deck')
+        self.logger.info('%s added \'%s\' to their ninja deck', self.username, card.name)
 
         return True
 
@@ -215,12 +243,12 @@ class Penguin(Spheniscidae, penguin.Penguin):
         cost = cost if cost is not None else flooring.cost
 
         await self.flooring.insert(flooring_id=flooring.id)
-        await self.update(coins=self.coins - cost).apply()
+        await self.apply_update(flush=True, coins=self.coins - cost)
 
         if notify:
             await self.send_xt('ag', flooring.id, self.coins)
 
-        self.logger.info(f'{self.username} added \'{flooring.name}\' to their flooring inventory')
+        self.logger.info('%s added \'%s\' to their flooring inventory', self.username, flooring.name)
 
         return True
 
@@ -231,12 +259,12 @@ class Penguin(Spheniscidae, penguin.Penguin):
         cost = cost if cost is not None else location.cost
 
         await self.locations.insert(location_id=location.id)
-        await self.update(coins=self.coins - cost).apply()
+        await self.apply_update(flush=True, coins=self.coins - cost)
 
         if notify:
             await self.send_xt('aloc', location.id, self.coins)
 
-        self.logger.info(f'{self.username} added \'{location.name}\' to their location inventory')
+        self.logger.info('%s added \'%s\' to their location inventory', self.username, location.name)
 
         return True
 
@@ -244,21 +272,22 @@ class Penguin(Spheniscidae, penguin.Penguin):
         if stamp.id in self.stamps:
             return False
 
-        await self.server.redis.set(self.get_recent_stamp_key(stamp.id), 1)
+        await self.server.redis.sadd(self.recent_stamps_key, stamp.id)
 
         await self.stamps.insert(stamp_id=stamp.id)
 
         if notify:
             await self.send_xt('aabs', stamp.id)
 
-        self.logger.info(f'{self.username} earned stamp \'{stamp.name}\'')
-        self.server.cache.delete(f'stamps.{self.id}')
+        self.logger.info('%s earned stamp \'%s\'', self.username, stamp.name)
+        await self.server.cache.delete(f'stamps.{self.id}')
 
         return True
 
-    def get_recent_stamp_key(self, stamp_id):
-        """Get redis key that locates the session recency of a stamp"""
-        return f'{self.id}.{stamp_id}.recentstamp'
+    @property
+    def recent_stamps_key(self):
+        """Get redis key of the set of stamps earned this game session"""
+        return f'houdini.recentstamps.{self.id}'
 
     async def add_inbox(self, postcard, sender_name="sys", sender_id=None, details=""):
         penguin_postcard = await PenguinPostcard.create(penguin_id=self.id, sender_id=sender_id,
@@ -266,11 +295,24 @@ class Penguin(Spheniscidae, penguin.Penguin):
 
         await self.send_xt('mr', sender_name, 0, postcard.id, details, int(time.time()), penguin_postcard.id)
 
+    async def add_inbox_many(self, postcards):
+        """Sends many system postcards, given as (postcard, details) pairs, with a single insert"""
+        if not postcards:
+            return
+
+        postcard_query = PenguinPostcard.insert().values([
+            dict(penguin_id=self.id, postcard_id=postcard.id, details=details) for postcard, details in postcards
+        ]).returning(PenguinPostcard.id, PenguinPostcard.postcard_id, PenguinPostcard.details)
+
+        send_date = int(time.time())
+        for penguin_postcard_id, postcard_id, details in await postcard_query.gino.all():
+            await self.send_xt('mr', 'sys', 0, postcard_id, details, send_date, penguin_postcard_id)
+
     async def add_permission(self, permission):
         if permission.name not in self.permissions:
             await self.permissions.insert(permission_name=permission.name)
 
-        self.logger.info(f'{self.username} was assigned permission \'{permission.name}\'')
+        self.logger.info('%s was assigned permission \'%s\'', self.username, permission.name)
 
         return True
 
@@ -282,7 +324,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
                     server_permission.name.startswith(permission_root.name + '.'):
                 await self.permissions.delete(server_permission.name)
 
-        self.logger.info(f'{self.username} had permission \'{permission_root.name}\' revoked')
+        self.logger.info('%s had permission \'%s\' revoked', self.username, permission_root.name)
 
         return True
 
@@ -299,7 +341,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
             attribute = self.attributes[name]
             await attribute.update(value=value).apply()
 
-        self.logger.info(f'{self.username} set custom attribute \'{name}\' to \'{value}\'')
+        self.logger.info('%s set custom attribute \'%s\' to \'%s\'', self.username, name, value)
 
         return True
 
@@ -307,85 +349,110 @@ class Penguin(Spheniscidae, penguin.Penguin):
         if name in self.attributes:
             await self.attributes.delete(name)
 
-        self.logger.info(f'{self.username} deleted attribute \'{name}\'')
+        self.logger.info('%s deleted attribute \'%s\'', self.username, name)
 
         return True
 
     async def add_coins(self, coins, stay=False):
         if stay:
             await self.join_room(self.room)
-        await self.update(coins=self.coins + coins).apply()
+        await self.apply_update(coins=self.coins + coins)
         await self.send_xt('zo', self.coins, '', 0, 0, 0)
         return self.coins
 
     async def set_color(self, item):
         await self.update(color=item.id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upc', self.id, item.id)
-        self.logger.info(f'{self.username} updated their color to \'{item.name}\' ')
+        self.logger.info('%s updated their color to \'%s\' ', self.username, item.name)
 
     async def set_head(self, item):
         item_id = None if item is None else item.id
         await self.update(head=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('uph', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their head item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their head item')
+        if item:
+            self.logger.info('%s updated their head item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their head item', self.username)
 
     async def set_face(self, item):
         item_id = None if item is None else item.id
         await self.update(face=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upf', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their face item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their face item')
+        if item:
+            self.logger.info('%s updated their face item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their face item', self.username)
 
     async def set_neck(self, item):
         item_id = None if item is None else item.id
         await self.update(neck=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upn', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their neck item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their neck item')
+        if item:
+            self.logger.info('%s updated their neck item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their neck item', self.username)
 
     async def set_body(self, item):
         item_id = None if item is None else item.id
         await self.update(body=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upb', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their body item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their body item')
+        if item:
+            self.logger.info('%s updated their body item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their body item', self.username)
 
     async def set_hand(self, item):
         item_id = None if item is None else item.id
         await self.update(hand=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upa', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their hand item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their hand item')
+        if item:
+            self.logger.info('%s updated their hand item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their hand item', self.username)
 
     async def set_feet(self, item):
         item_id = None if item is None else item.id
         await self.update(feet=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upe', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their feet item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their feet item')
+        if item:
+            self.logger.info('%s updated their feet item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their feet item', self.username)
 
     async def set_flag(self, item):
         item_id = None if item is None else item.id
         await self.update(flag=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upl', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their flag item to \'{item.name}\' ' if item else
-                         f'{self.username} removed their flag item')
+        if item:
+            self.logger.info('%s updated their flag item to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their flag item', self.username)
 
     async def set_photo(self, item):
         item_id = None if item is None else item.id
         await self.update(photo=item_id).apply()
+        self.invalidate_string()
         await self.room.send_xt('upp', self.id, item_id or 0)
 
-        self.logger.info(f'{self.username} updated their background to \'{item.name}\' ' if item else
-                         f'{self.username} removed their background item')
+        if item:
+            self.logger.info('%s updated their background to \'%s\'', self.username, item.name)
+        else:
+            self.logger.info('%s removed their background item', self.username)
 
     async def send_card_jitsu_stamp_info(self):
         """
@@ -423,15 +490,20 @@ class Penguin(Spheniscidae, penguin.Penguin):
 
         game_stamps_ids = [stamp.id for stamp in game_stamps]
 
-        recently_collected_game_stamps = []
+        if clear_session:
+            async with self.server.redis.pipeline(transaction=True) as tr:
+                tr.smembers(self.recent_stamps_key)
+                tr.delete(self.recent_stamps_key)
+                recent_stamp_ids, _ = await tr.execute()
+        else:
+            recent_stamp_ids = await self.server.redis.smembers(self.recent_stamps_key)
+        recent_stamp_ids = {int(stamp_id) for stamp_id in recent_stamp_ids}
 
-        for stamp in self.stamps.values():
-            if stamp.stamp_id in game_stamps_ids:
-                is_recent = await self.server.redis.get(
-                    self.get_recent_stamp_key(stamp.stamp_id)
-                )
-                if is_recent:
-                    recently_collected_game_stamps.append(stamp)
+        recently_collected_game_stamps = [
+            stamp
+            for stamp in self.stamps.values()
+            if stamp.stamp_id in game_stamps_ids and stamp.stamp_id in recent_stamp_ids
+        ]
 
         collected_game_stamps = [
             stamp for stamp in game_stamps if (stamp.id in self.stamps and stamp)
@@ -453,9 +525,6 @@ class Penguin(Spheniscidae, penguin.Penguin):
             ]
         )
 
-        if clear_session:
-            await self.clear_stamps_session()
-
         return (
             collected_game_stamps_string,
             total_collected_game_stamps,
@@ -467,8 +536,7 @@ class Penguin(Spheniscidae, penguin.Penguin):
         """
         Exits a game session and unmarks all stamps since we are no longer in their session
         """
-        async for key in self.server.redis.scan_iter(self.get_recent_stamp_key("*")):
-            await self.server.redis.delete(key)
+        await self.server.redis.delete(self.recent_stamps_key)
 
     def __repr__(self):
         if self.id is not None:
@@ -0,0 +1,36 @@
+from houdini import commands
+from houdini.plugins import IPlugin
+
+
+class Profiler(IPlugin):
+    author = "Houdini"
+    description = "Moderator commands to profile a running server"
+    version = "1.0.0"
+
+    def __init__(self, server):
+        super().__init__(server)
+
+    async def ready(self):
+        pass
+
+    @commands.group('profile')
+    @commands.player_attribute(moderator=True)
+    async def profile(self, p):
+        status = 'running' if self.server.profiler.running else 'stopped'
+        await p.send_xt('cprompt', f'Profiler is {status}')
+
+    @profile.command('start')
+    @commands.player_attribute(moderator=True)
+    async def profile_start(self, p, output_format: str = None):
+        if output_format not in (None, 'collapsed', 'pstats'):
+            return await p.send_xt('cprompt', 'Profile format must be collapsed or pstats')
+        if self.server.profiler.start(output_format):
+            await p.send_xt('cprompt', 'Profiler started')
+        else:
+            await p.send_xt('cprompt', 'Profiler is already running')
+
+    @profile.command('stop')
+    @commands.player_attribute(moderator=True)
+    async def profile_stop(self, p):
+        path = await self.server.profiler.stop()
+        await p.send_xt('cprompt', f'Profile written to {path}' if path else 'Profiler is not running')
@@ -0,0 +1,141 @@
+import asyncio
+import collections
+import marshal
+import os
+import sys
+import threading
+import time
+
+IdleFrame = '-'
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler which samples the event loop thread's stack from a background thread.
+    Each sample is attributed to the XT packet whose handler is on the stack, and the samples
+    are written as collapsed stacks for flame graphs or as a pstats file.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.interval = server.config.profile_interval
+        self.directory = server.config.profile_directory
+
+        self.output_format = None
+        self.started = None
+        self.duration = None
+
+        self._samples = None
+        self._handlers = None
+        self._loop_thread_id = None
+        self._sampler = None
+        self._stopped = threading.Event()
+        self._toggling = None
+
+    @property
+    def running(self):
+        return self._sampler is not None
+
+    def start(self, output_format=None):
+        if self.running:
+            return False
+
+        self.output_format = output_format or self.server.config.profile_format
+        self.started = time.time()
+
+        self._samples = collections.Counter()
+        self._handlers = {listener.callback.__code__: packet.id for packet, listeners in
+                          self.server.xt_listeners.items() for listener in listeners}
+        self._loop_thread_id = threading.get_ident()
+
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample, name='profiler', daemon=True)
+        self._sampler.start()
+
+        self.server.logger.info('Profiler started, sampling every %ss', self.interval)
+        return True
+
+    async def stop(self):
+        """Stops sampling and writes the profile in an executor, returning its path"""
+        if not self.running:
+            return None
+
+        self._stopped.set()
+        self._sampler.join()
+        self._sampler = None
+        self.duration = time.time() - self.started
+
+        extension = 'pstats' if self.output_format == 'pstats' else 'collapsed'
+        name = self.server.config.name.lower() if self.server.config.worker_id is None \
+            else f'{self.server.config.name.lower()}-{self.server.config.worker_id}'
+        path = os.path.join(self.directory, f'{name}-{int(self.started)}.{extension}')
+        write = self.write_pstats if self.output_format == 'pstats' else self.write_collapsed
+        samples = self._samples
+        await asyncio.get_running_loop().run_in_executor(None, write, path, samples, self.duration)
+
+        self.server.logger.info('Profiler stopped, wrote %d samples to %s', sum(samples.values()), path)
+        return path
+
+    def toggle(self):
+        if self.running:
+            if self._toggling is None:
+                self._toggling = asyncio.create_task(self.stop())
+                self._toggling.add_done_callback(self._toggled)
+        else:
+            self.start()
+
+    def _toggled(self, task):
+        self._toggling = None
+        exception = None if task.cancelled() else task.exception()
+        if exception is not None:
+            self.server.logger.error('Failed to write profile', exc_info=exception)
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+
+            stack = []
+            packet_id = None
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                packet_id = self._handlers.get(code, packet_id)
+                frame = frame.f_back
+            stack.reverse()
+
+            self._samples[packet_id, tuple(stack)] += 1
+
+    def write_collapsed(self, path, samples, duration):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'w') as collapsed:
+            for (packet_id, stack), count in samples.items():
+                frames = ';'.join(f'{name} ({filename}:{line})' for filename, line, name in stack)
+                collapsed.write(f'{packet_id or IdleFrame};{frames} {count}\n')
+
+    def write_pstats(self, path, samples, duration):
+        stats = {}
+        sample_time = duration / max(1, sum(samples.values()))
+        for (packet_id, stack), count in samples.items():
+            elapsed = count * sample_time
+            stack = [('~', 0, f'<packet {packet_id or IdleFrame}>')] + list(stack)
+
+            for depth, function in enumerate(stack):
+                call_count, primitive_count, total_time, cumulative_time, callers = \
+                    stats.get(function, (0, 0, 0.0, 0.0, {}))
+                if function not in stack[:depth]:
+                    cumulative_time += elapsed
+                if depth == len(stack) - 1:
+                    total_time += elapsed
+                stats[function] = (call_count + count, primitive_count + count, total_time, cumulative_time, callers)
+
+                if depth:
+                    caller = stack[depth - 1]
+                    caller_count, caller_primitive, caller_total, caller_cumulative = \
+                        callers.get(caller, (0, 0, 0.0, 0.0))
+                    callers[caller] = (caller_count + count, caller_primitive + count,
+                                       caller_total + (elapsed if depth == len(stack) - 1 else 0.0),
+                                       caller_cumulative + elapsed)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, 'wb') as pstats:
+            marshal.dump(stats, pstats)
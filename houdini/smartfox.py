@@ -0,0 +1,108 @@
+import re
+from xml.etree.ElementTree import Element, SubElement
+from xml.sax.saxutils import escape
+
+import defusedxml.ElementTree as Et
+
+_PolicyFileRequest = re.compile(r'<policy-file-request\s*/>')
+_Message = re.compile(r'<msg t=([\'"])sys\1>'
+                      r'<body action=([\'"])(\w+)\2 r=([\'"])(-?\d+)\4\s*(?:/>|>(.*)</body>)'
+                      r'</msg>', re.DOTALL)
+
+_VersionBody = re.compile(r'<ver v=([\'"])(\d+)\1\s*/>')
+_LoginHead = re.compile(r'<login z=([\'"])([^\'"<>&]*)\1><nick><!\[CDATA\[')
+_LoginSeparator = ']]></nick><pword><![CDATA['
+_LoginTail = ']]></pword></login>'
+
+MaxFastPathLength = 4096
+
+_AttributeEntities = {'"': '&quot;', '\n': '&#10;', '\r': '&#13;', '\t': '&#09;'}
+
+
+def _parse_login(body_data):
+    """Splits a login body on its CDATA delimiters in one pass, returning None if it isn't the exact shape"""
+    head_match = _LoginHead.match(body_data)
+    if head_match is None:
+        return None
+
+    separator = body_data.find(_LoginSeparator, head_match.end())
+    if separator == -1:
+        return None
+
+    password_start = separator + len(_LoginSeparator)
+    if body_data.find(_LoginTail, password_start) != len(body_data) - len(_LoginTail):
+        return None
+
+    nickname = body_data[head_match.end():separator]
+    password = body_data[password_start:len(body_data) - len(_LoginTail)]
+    if ']]>' in nickname or ']]>' in password:
+        return None
+    return head_match.group(2), nickname, password
+
+
+def _parse_body(body, body_data):
+    if not body_data:
+        return True
+
+    version_match = _VersionBody.fullmatch(body_data)
+    if version_match is not None:
+        SubElement(body, 'ver', v=version_match.group(2))
+        return True
+
+    login_data = _parse_login(body_data)
+    if login_data is not None:
+        zone, nickname, password = login_data
+        login = SubElement(body, 'login', z=zone)
+        SubElement(login, 'nick').text = nickname
+        SubElement(login, 'pword').text = password
+        return True
+
+    return False
+
+
+def parse_xml(data):
+    """
+    Parses the fixed SmartFox system message shapes without a full XML parser,
+    anything else is handed to defusedxml.
+    """
+    if len(data) > MaxFastPathLength:
+        return Et.fromstring(data)
+
+    if _PolicyFileRequest.fullmatch(data):
+        return Element('policy-file-request')
+
+    message_match = _Message.fullmatch(data)
+    if message_match is not None:
+        _, _, action, _, r, body_data = message_match.groups()
+
+        message = Element('msg', t='sys')
+        body = SubElement(message, 'body', action=action, r=r)
+        if _parse_body(body, body_data):
+            return message
+
+    return Et.fromstring(data)
+
+
+def encode_xml(xml_dict):
+    """Serializes a system message dictionary, nesting each element inside the previous one"""
+    xml_data = ['<msg t="sys">']
+    closing_tags = ['</msg>']
+
+    last_index = len(xml_dict) - 1
+    for index, (tag, value) in enumerate(xml_dict.items()):
+        if type(value) is dict:
+            attributes = ''.join(f' {key}="{escape(attribute, _AttributeEntities)}"'
+                                 for key, attribute in value.items())
+            if index == last_index:
+                xml_data.append(f'<{tag}{attributes} />')
+                continue
+            xml_data.append(f'<{tag}{attributes}>')
+        elif not value and index == last_index:
+            xml_data.append(f'<{tag} />')
+            continue
+        else:
+            xml_data.append(f'<{tag}>{escape(value)}')
+        closing_tags.append(f'</{tag}>')
+
+    xml_data.extend(reversed(closing_tags))
+    return ''.join(xml_data).encode('utf-8') + b'\x00'
@@ -1,19 +1,22 @@
-from asyncio import CancelledError, IncompleteReadError, LimitOverrunError
-from xml.etree.cElementTree import Element, SubElement, tostring
-
-import defusedxml.cElementTree as Et
+import logging
+from asyncio import CancelledError, IncompleteReadError, LimitOverrunError, get_event_loop
+from collections import deque
 
+from houdini import compile_xt
 from houdini.constants import ClientType
-from houdini.handlers import AuthorityError, AbortHandlerChain, XMLPacket, XTPacket
+from houdini.handlers import AuthorityError, AbortHandlerChain, XMLPacket
+from houdini.smartfox import encode_xml, parse_xml
 
 
 class Spheniscidae:
 
     __slots__ = ['__reader', '__writer', 'server', 'logger',
                  'peer_name', 'received_packets', 'joined_world',
-                 'client_type']
+                 'client_type', 'cooldowns', '__outgoing', '__outgoing_size',
+                 '__flush_handle', '__overflowing', '__frames', '__buffer', '__searched']
 
     Delimiter = b'\x00'
+    ReadSize = 2 ** 16
 
     def __init__(self, server, reader, writer):
         self.__reader = reader
@@ -29,6 +32,19 @@ class Spheniscidae:
         self.client_type = None
 
         self.received_packets = set()
+        self.cooldowns = {}
+
+        self.__outgoing = []
+        self.__outgoing_size = 0
+        self.__flush_handle = None
+        self.__overflowing = False
+
+        self.__frames = deque()
+        self.__buffer = bytearray()
+        self.__searched = 0
+
+        writer.transport.set_write_buffer_limits(high=server.config.write_buffer_high,
+                                                 low=server.config.write_buffer_low)
 
         super().__init__()
 
@@ -53,64 +69,96 @@ class Spheniscidae:
         await self.close()
 
     async def send_xt(self, handler_id, *data):
-        internal_id = -1
-
-        xt_data = '%'.join(str(d) for d in data)
-        line = f'%xt%{handler_id}%{internal_id}%{xt_data}%'
-        await self.send_line(line)
+        await self.send_line(compile_xt(handler_id, *data))
 
     async def send_xml(self, xml_dict):
-        data_root = Element('msg')
-        data_root.set('t', 'sys')
+        self.send_encoded(encode_xml(xml_dict))
+
+    async def send_line(self, data):
+        if not self.__writer.is_closing():
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('Outgoing data: %s', data)
+            self.__queue_line(data.encode('utf-8') + Spheniscidae.Delimiter)
 
-        sub_element_parent = data_root
-        for sub_element, sub_element_attribute in xml_dict.items():
-            sub_element_object = SubElement(sub_element_parent, sub_element)
+    def send_encoded(self, line):
+        if not self.__writer.is_closing():
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('Outgoing data: %s', line)
+            self.__queue_line(line)
 
-            if type(xml_dict[sub_element]) is dict:
-                for sub_element_attribute_key, sub_element_attribute_value in xml_dict[sub_element].items():
-                    sub_element_object.set(sub_element_attribute_key, sub_element_attribute_value)
-            else:
-                sub_element_object.text = xml_dict[sub_element]
+    @property
+    def buffered_size(self):
+        return self.__outgoing_size + self.__writer.transport.get_write_buffer_size()
+
+    def __queue_line(self, line):
+        if self.__is_overflowing():
+            if self.server.config.write_buffer_overflow == 'disconnect':
+                self.logger.warning('%s exceeded the outgoing buffer limit, disconnecting', self)
+                self.__outgoing.clear()
+                self.__outgoing_size = 0
+                self.__writer.close()
+            return
 
-            sub_element_parent = sub_element_object
+        self.__outgoing.append(line)
+        self.__outgoing_size += len(line)
 
-        xml_data = tostring(data_root)
-        await self.send_line(xml_data.decode('utf-8'))
+        if self.__flush_handle is None:
+            self.__flush_handle = get_event_loop().call_soon(self.__flush)
 
-    async def send_line(self, data):
-        if not self.__writer.is_closing():
-            self.logger.debug(f'Outgoing data: {data}')
-            self.__writer.write(data.encode('utf-8') + Spheniscidae.Delimiter)
+    def __is_overflowing(self):
+        buffered_size = self.buffered_size
+        if not self.__overflowing and buffered_size >= self.server.config.write_buffer_high:
+            self.__overflowing = True
+        elif self.__overflowing and buffered_size <= self.server.config.write_buffer_low:
+            self.__overflowing = False
+        return self.__overflowing
+
+    def __flush(self):
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+
+        if self.__outgoing and not self.__writer.is_closing():
+            self.__writer.write(b''.join(self.__outgoing))
+        self.__outgoing.clear()
+        self.__outgoing_size = 0
 
     async def close(self):
+        self.__flush()
         self.__writer.close()
 
         await self._client_disconnected()
 
     async def __handle_xt_data(self, data):
-        self.logger.debug(f'Received XT data: {data}')
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Received XT data: %s', data)
         parsed_data = data.split('%')[1:-1]
 
-        packet_id = parsed_data[2]
-        packet = XTPacket(packet_id, ext=parsed_data[1])
+        ext, packet_id = parsed_data[1], parsed_data[2]
 
-        if packet in self.server.xt_listeners:
-            xt_listeners = self.server.xt_listeners[packet]
-            packet_data = parsed_data[4:]
+        try:
+            packet, xt_listeners = self.server.xt_listeners.lookup[ext, packet_id]
+        except KeyError:
+            self.logger.warn('Handler for %s doesn\'t exist!', packet_id)
+            return
 
+        packet_data = parsed_data[4:]
+
+        self.server.watchdog.begin(self, packet.id)
+        try:
             for listener in xt_listeners:
                 if not self.__writer.is_closing() and listener.client_type is None \
                         or listener.client_type == self.client_type:
                     await listener(self, packet_data)
-            self.received_packets.add(packet)
-        else:
-            self.logger.warn('Handler for %s doesn\'t exist!', packet_id)
+        finally:
+            self.server.watchdog.end(self)
+        self.received_packets.add(packet)
 
     async def __handle_xml_data(self, data):
-        self.logger.debug(f'Received XML data: {data}')
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('Received XML data: %s', data)
 
-        element_tree = Et.fromstring(data)
+        element_tree = parse_xml(data)
 
         if element_tree.tag == 'policy-file-request':
             await self.send_policy_file()
@@ -126,10 +174,14 @@ class Spheniscidae:
                 if packet in self.server.xml_listeners:
                     xml_listeners = self.server.xml_listeners[packet]
 
-                    for listener in xml_listeners:
-                        if not self.__writer.is_closing() and listener.client_type is None \
-                                or listener.client_type == self.client_type:
-                            await listener(self, body_tag)
+                    self.server.watchdog.begin(self, packet.id)
+                    try:
+                        for listener in xml_listeners:
+                            if not self.__writer.is_closing() and listener.client_type is None \
+                                    or listener.client_type == self.client_type:
+                                await listener(self, body_tag)
+                    finally:
+                        self.server.watchdog.end(self)
 
                     self.received_packets.add(packet)
                 else:
@@ -141,40 +193,64 @@ class Spheniscidae:
             self.logger.warn('Received invalid XML data!')
 
     async def _client_connected(self):
-        self.logger.info(f'Client {self.peer_name} connected')
+        self.logger.info('Client %s connected', self.peer_name)
 
         await self.server.dummy_event_listeners.fire('connected', self)
 
     async def _client_disconnected(self):
         if self.peer_name in self.server.peers_by_ip:
             del self.server.peers_by_ip[self.peer_name]
-            self.logger.info(f'Client {self.peer_name} disconnected')
+            self.logger.info('Client %s disconnected', self.peer_name)
 
             await self.server.dummy_event_listeners.fire('disconnected', self)
 
     async def __data_received(self, data):
-        data = data.decode()[:-1]
+        data = data.decode()
         try:
             if data.startswith('<'):
                 await self.__handle_xml_data(data)
             else:
                 await self.__handle_xt_data(data)
         except AuthorityError:
-            self.logger.debug(f'{self} tried to send game packet before authentication')
+            self.logger.debug('%s tried to send game packet before authentication', self)
         except AbortHandlerChain as e:
-            self.logger.info(f'Handler chain aborted: {str(e)}')
+            self.logger.info('Handler chain aborted: %s', str(e))
+
+    async def __read_stream_frames(self):
+        data = await self.__reader.readuntil(separator=Spheniscidae.Delimiter)
+        self.__frames.append(data[:-1])
+
+    async def __read_buffered_frames(self):
+        data = await self.__reader.read(Spheniscidae.ReadSize)
+        if not data:
+            raise IncompleteReadError(bytes(self.__buffer), None)
+
+        self.__buffer += data
+        start, end = 0, self.__buffer.find(Spheniscidae.Delimiter, self.__searched)
+        while end != -1:
+            if end > start:
+                self.__frames.append(bytes(self.__buffer[start:end]))
+            start, end = end + 1, self.__buffer.find(Spheniscidae.Delimiter, end + 1)
+
+        del self.__buffer[:start]
+        self.__searched = len(self.__buffer)
+        if len(self.__buffer) > Spheniscidae.ReadSize:
+            raise LimitOverrunError('Incoming frame exceeds the read limit', len(self.__buffer))
 
     async def run(self):
+        read_frames = self.__read_buffered_frames if self.server.config.framing == 'buffered' \
+            else self.__read_stream_frames
+
         await self._client_connected()
         while not self.__writer.is_closing():
             try:
-                data = await self.__reader.readuntil(
-                    separator=Spheniscidae.Delimiter)
-                if data:
-                    await self.__data_received(data)
-                else:
-                    self.__writer.close()
-                await self.__writer.drain()
+                if not self.__frames:
+                    await read_frames()
+                if self.__frames:
+                    await self.__data_received(self.__frames.popleft())
+                if not self.__frames:
+                    self.__flush()
+                    await self.__writer.drain()
             except IncompleteReadError:
                 self.__writer.close()
             except CancelledError:
@@ -0,0 +1,114 @@
+import asyncio
+import math
+
+
+class Timer:
+
+    __slots__ = ['deadline', 'callback', 'args', 'cancelled']
+
+    def __init__(self, deadline, callback, args):
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel for per-player deadlines. Scheduling and firing are O(1), timers further
+    away than the first wheel cascade down a level at a time as their slot comes round.
+    Each timer fires its coroutine in its own task, so a slow callback never holds up the others.
+    """
+
+    def __init__(self, server, resolution=1.0, slots=64, levels=4):
+        self.server = server
+        self.resolution = resolution
+        self.slots = slots
+        self.levels = levels
+
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.overflow = []
+        self.tick = 0
+
+        self._task = None
+        self._callbacks = set()
+
+    def __len__(self):
+        return sum(len(slot) for wheel in self.wheels for slot in wheel) + len(self.overflow)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def call_later(self, delay, callback, *args):
+        """Schedules a coroutine function to be called with args after delay seconds, rounded up to the resolution"""
+        timer = Timer(self.tick + max(1, math.ceil(delay / self.resolution)), callback, args)
+        self.__insert(timer)
+        return timer
+
+    def __insert(self, timer):
+        ticks = timer.deadline - self.tick
+        if ticks <= 0:
+            return self.__fire(timer)
+
+        for level, wheel in enumerate(self.wheels):
+            if ticks < self.slots ** (level + 1):
+                wheel[(timer.deadline // self.slots ** level) % self.slots].append(timer)
+                return
+        self.overflow.append(timer)
+
+    def __cascade(self, timers):
+        for timer in timers:
+            if not timer.cancelled:
+                self.__insert(timer)
+
+    def __advance(self):
+        self.tick += 1
+
+        if self.tick % self.slots ** self.levels == 0:
+            overflow, self.overflow = self.overflow, []
+            self.__cascade(overflow)
+
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if self.tick % span == 0:
+                slot = (self.tick // span) % self.slots
+                timers, self.wheels[level][slot] = self.wheels[level][slot], []
+                self.__cascade(timers)
+
+        slot = self.tick % self.slots
+        timers, self.wheels[0][slot] = self.wheels[0][slot], []
+        self.__cascade(timers)
+
+    def __fire(self, timer):
+        if not timer.cancelled:
+            task = asyncio.create_task(self.__call(timer), name=timer.callback.__qualname__)
+            self._callbacks.add(task)
+            task.add_done_callback(self.__done)
+
+    def __done(self, task):
+        self._callbacks.discard(task)
+        exception = None if task.cancelled() else task.exception()
+        if exception is not None:
+            self.server.logger.error('Timer callback %s failed', task.get_name(), exc_info=exception)
+
+    @staticmethod
+    async def __call(timer):
+        if not timer.cancelled:
+            await timer.callback(*timer.args)
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        while True:
+            await asyncio.sleep(max(0.0, started + (self.tick + 1) * self.resolution - loop.time()))
+            elapsed_ticks = int((loop.time() - started) / self.resolution)
+            while self.tick < elapsed_ticks:
+                self.__advance()
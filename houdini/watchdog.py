@@ -0,0 +1,143 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+ReportInterval = 60
+
+
+def get_awaiting_stack(coro):
+    """Formats the chain of coroutines a suspended task is awaiting through"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append((frame, frame.f_lineno))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return ''.join(traceback.format_list(traceback.StackSummary.extract(frames))) or None
+
+
+class _Run:
+
+    __slots__ = ['packet_id', 'started', 'task', 'stack', 'reported']
+
+    def __init__(self, packet_id, started, task):
+        self.packet_id = packet_id
+        self.started = started
+        self.task = task
+        self.stack = None
+        self.reported = False
+
+
+class Watchdog:
+    """
+    Measures event loop lag and reports packet handlers which run for longer than the threshold,
+    as soon as they pass it rather than when they finish, so a handler that never returns is reported too.
+    A handler that is slow because it's awaiting gets the stack it was awaiting on, one that blocks
+    the loop gets the stack a sampling thread finds the loop thread stuck in. Reports are limited
+    to one per packet every minute.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.threshold = server.config.watchdog_threshold
+        self.interval = min(1.0, self.threshold / 2) if self.threshold else 1.0
+
+        self.loop_lag = 0.0
+        self.max_loop_lag = 0.0
+
+        self._running = {}
+        self._reports = {}
+
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id = None
+        self._ticker = None
+        self._sampler = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._ticker = asyncio.create_task(self._tick())
+
+        if self.threshold:
+            self._sampler = threading.Thread(target=self._sample, name='watchdog', daemon=True)
+            self._sampler.start()
+
+    def close(self):
+        self._stopped.set()
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+
+    def begin(self, p, packet_id):
+        if self.threshold:
+            self._running[p] = _Run(packet_id, time.monotonic(), asyncio.current_task())
+
+    def end(self, p):
+        run = self._running.pop(p, None) if self.threshold else None
+        if run is None or run.reported:
+            return
+
+        elapsed = time.monotonic() - run.started
+        if elapsed > self.threshold:
+            self.report(run.packet_id, '%s took %.3fs handling %s\n%s', p, elapsed, run.packet_id,
+                        run.stack or 'No stack was captured')
+
+    def report(self, key, message, *args):
+        now = time.monotonic()
+        last_report, suppressed = self._reports.get(key, (0.0, 0))
+        if now - last_report < ReportInterval:
+            self._reports[key] = (last_report, suppressed + 1)
+            return
+
+        self._reports[key] = (now, 0)
+        if suppressed:
+            message += '\n(%d similar reports suppressed)'
+            args += (suppressed,)
+        self.server.logger.error(message, *args)
+
+    async def _tick(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self._heartbeat = time.monotonic()
+            self.loop_lag = max(0.0, loop.time() - expected)
+            self.max_loop_lag = max(self.max_loop_lag, self.loop_lag)
+
+            for p, run in list(self._running.items()):
+                elapsed = self._heartbeat - run.started
+                if run.reported or elapsed <= self.threshold:
+                    continue
+                if run.stack is None:
+                    run.stack = get_awaiting_stack(run.task.get_coro())
+
+                run.reported = True
+                self.report(run.packet_id, '%s has been handling %s for %.3fs\n%s', p, run.packet_id, elapsed,
+                            run.stack or 'No stack was captured')
+
+    def _sample(self):
+        stalled = False
+        while not self._stopped.wait(self.interval):
+            stalled_for = time.monotonic() - self._heartbeat - self.interval
+            if stalled_for <= self.threshold:
+                stalled = False
+                continue
+            if stalled:
+                continue
+
+            stalled = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame is not None else 'No stack was captured'
+
+            frames = set()
+            while frame is not None:
+                frames.add(frame)
+                frame = frame.f_back
+            for run in list(self._running.values()):
+                if getattr(run.task.get_coro(), 'cr_frame', None) in frames:
+                    run.stack = stack
+
+            self.report('loop', 'Event loop blocked for over %.3fs\n%s', stalled_for, stack)
@@ -0,0 +1,75 @@
+import asyncio
+from collections import defaultdict
+
+from houdini.data import db
+from houdini.data.penguin import Penguin
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces penguin column updates in memory and writes them in batches,
+    so handlers don't wait on the database for every coin or medal change.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.interval = server.config.write_behind_interval
+
+        self._dirty = {}
+        self._flusher = None
+        self._flushing = asyncio.Lock()
+
+    def start(self):
+        self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+
+    def mark(self, p, values):
+        self._dirty.setdefault(p.id, {}).update(values)
+
+    async def flush(self, p=None):
+        """
+        Writes the pending columns of one penguin, or of every penguin if none is given, after any write
+        already in flight. Returns whether every pending column was written.
+        """
+        async with self._flushing:
+            if p is None:
+                dirty, self._dirty = self._dirty, {}
+            elif p.id in self._dirty:
+                dirty = {p.id: self._dirty.pop(p.id)}
+            else:
+                return True
+            return await self.__write(dirty)
+
+    async def __write(self, dirty):
+        written = True
+        batches = defaultdict(list)
+        for penguin_id, values in dirty.items():
+            batches[tuple(sorted(values))].append({'_id': penguin_id, **{f'_{column}': value
+                                                                         for column, value in values.items()}})
+
+        for columns, rows in batches.items():
+            query = Penguin.update.values(**{column: db.bindparam(f'_{column}') for column in columns})
+            query = query.where(Penguin.id == db.bindparam('_id'))
+            try:
+                await db.status(query, rows)
+            except Exception as e:
+                self.server.logger.exception(e)
+                written = False
+                for row in rows:
+                    values = {column: row[f'_{column}'] for column in columns}
+                    if row['_id'] in self.server.penguins_by_id:
+                        self._dirty[row['_id']] = {**values, **self._dirty.get(row['_id'], {})}
+                    else:
+                        self.server.logger.error('Dropped unwritten columns of offline penguin %s: %s',
+                                                 row['_id'], values)
+        return written
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()